@@ -0,0 +1,106 @@
+"""
+Resolve owners for a large PR against a large synthetic CODEOWNERS file,
+comparing the compiled OwnershipIndex with a naive "test every rule
+against every file" matcher, and checking both agree.
+
+    python -m benchmarks.codeowners --services 1000 --files 1000
+"""
+import argparse
+import json
+import random
+import time
+
+from src.app.services.codeowners import OwnershipIndex, pattern_segments, _segment_regex
+
+def synthetic_codeowners(services: int, libs: int) -> str:
+    lines = ["* @platform-default", "*.md @docs-writer", "**/migrations/ @dba", "docs/* @docs-writer"]
+    for i in range(services):
+        lines.append(f"/services/svc{i}/ @owner{i % 200}")
+        lines.append(f"/services/svc{i}/api/*.proto @api{i % 50}")
+        lines.append(f"/services/svc{i}/tests/ @qa{i % 20} @org/qa-team")
+    for j in range(libs):
+        lines.append(f"/libs/lib{j}/src/ @lib{j}")
+        lines.append(f"libs/lib{j}/**/generated/ @codegen")
+    return "\n".join(lines)
+
+def synthetic_files(count: int, services: int, libs: int, rng: random.Random) -> list:
+    files = []
+    for n in range(count):
+        kind = rng.random()
+        if kind < 0.6:
+            svc = rng.randrange(services)
+            sub = rng.choice(["src", "api", "tests", "migrations", "src/handlers"])
+            ext = rng.choice([".py", ".proto", ".md", ".sql"])
+            files.append(f"services/svc{svc}/{sub}/file{n}{ext}")
+        elif kind < 0.9:
+            lib = rng.randrange(libs)
+            sub = rng.choice(["src", "src/generated", "tests", "src/x/generated"])
+            files.append(f"libs/lib{lib}/{sub}/file{n}.py")
+        else:
+            files.append(rng.choice([f"docs/page{n}.md", f"docs/guide/page{n}.md", f"tools/script{n}.sh", "README.md"]))
+    return files
+
+class NaiveMatcher:
+    """Reference implementation: every rule is tried against every file, last match wins."""
+
+    def __init__(self, rules):
+        self.rules = [(pattern_segments(p), owners) for p, owners in rules]
+        self._regex = {}
+
+    def _seg(self, pattern: str, part: str) -> bool:
+        regex = self._regex.get(pattern)
+        if regex is None:
+            regex = self._regex[pattern] = _segment_regex(pattern)
+        return bool(regex.match(part))
+
+    def _match(self, segs, parts) -> bool:
+        if not segs:
+            return not parts
+        if segs[0] == "**":
+            return any(self._match(segs[1:], parts[i:]) for i in range(len(parts) + 1))
+        return bool(parts) and self._seg(segs[0], parts[0]) and self._match(segs[1:], parts[1:])
+
+    def owners_for(self, path: str):
+        parts = path.split("/")
+        for segs, owners in reversed(self.rules):
+            if self._match(segs, parts):
+                return owners
+        return []
+
+def main(services: int, libs: int, files: int, seed: int):
+    rng = random.Random(seed)
+    text = synthetic_codeowners(services, libs)
+    paths = synthetic_files(files, services, libs, rng)
+
+    start = time.perf_counter()
+    index = OwnershipIndex.from_text(text)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed = [index.owners_for(p) for p in paths]
+    resolve = time.perf_counter() - start
+
+    naive = NaiveMatcher(index.rules)
+    start = time.perf_counter()
+    expected = [naive.owners_for(p) for p in paths]
+    naive_time = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(indexed, expected) if a != b)
+    print(json.dumps({
+        "rules": len(index.rules),
+        "files": len(paths),
+        "index_build_ms": round(build * 1000, 2),
+        "index_resolve_ms": round(resolve * 1000, 2),
+        "naive_resolve_ms": round(naive_time * 1000, 2),
+        "speedup": round(naive_time / resolve, 1) if resolve else None,
+        "mismatches": mismatches,
+    }, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--services", type=int, default=1000)
+    parser.add_argument("--libs", type=int, default=300)
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    main(args.services, args.libs, args.files, args.seed)
@@ -0,0 +1,76 @@
+"""
+Compare fetching the PRs of a Slack message or reminder batch one by one
+over REST with the bulk GraphQL fetcher.
+
+A local stub serves both APIs and charges `--latency-ms` per request, so the
+difference is the number of round trips.
+
+    python -m benchmarks.github_graphql --prs 60 --latency-ms 40
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+# Read at import time: a throwaway database for the PR state store, and a token,
+# since GraphQL is only tried when one is configured
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp.name}/github_graphql.db"
+os.environ.setdefault("GITHUB_TOKEN", "benchmark")
+
+from benchmarks.stubs import StubServer, github_handler
+from src.app.database import init_db
+from src.app.services import github
+
+async def fetch_rest(prs):
+    return [await github.get_github_pr(*pr) for pr in prs]
+
+async def fetch_graphql(prs, include_files):
+    results = await github.get_github_prs(prs, include_files=include_files)
+    return [results[pr] for pr in prs]
+
+async def main(prs: int, repos: int, files_per_pr: int, latency_ms: float):
+    init_db()
+    keys = [("octo", f"repo{i % repos}", i + 1) for i in range(prs)]
+    workloads = {
+        "rest_one_by_one": lambda: fetch_rest(keys),
+        "graphql_bulk": lambda: fetch_graphql(keys, True),
+        "graphql_bulk_state_only": lambda: fetch_graphql(keys, False),
+    }
+
+    results = {}
+    baseline = None
+    for name, run in workloads.items():
+        server = StubServer(github_handler(latency_ms / 1000, files_per_pr))
+        async with server:
+            os.environ["GITHUB_API_URL"] = server.url
+            start = time.perf_counter()
+            fetched = await run()
+            elapsed = time.perf_counter() - start
+            await github.close_github_client()
+
+        if baseline is None:
+            baseline = fetched
+        # Same PRs must come back whichever API was used (files are skipped in state-only mode)
+        mismatches = sum(
+            1 for a, b in zip(baseline, fetched)
+            if a.model_dump(exclude={"changed_filenames"}) != b.model_dump(exclude={"changed_filenames"})
+            or (name != "graphql_bulk_state_only" and a.changed_filenames != b.changed_filenames)
+        )
+        results[name] = {
+            "round_trips": server.requests,
+            "ms_total": round(elapsed * 1000, 1),
+            "mismatches": mismatches,
+        }
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--prs", type=int, default=60)
+    parser.add_argument("--repos", type=int, default=5)
+    parser.add_argument("--files-per-pr", type=int, default=30)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.prs, args.repos, args.files_per_pr, args.latency_ms))
@@ -0,0 +1,57 @@
+"""
+Compare per-call GitHub clients with the shared pooled client.
+
+Each simulated PR does what a Slack message does: fetch the PR (PR + files)
+and fetch reviewers. A local stub stands in for api.github.com and charges
+`--handshake-ms` on every new connection to model the TCP+TLS setup cost.
+
+    python -m benchmarks.github_pool --prs 50 --handshake-ms 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from benchmarks.stubs import StubServer, github_handler
+from src.app.services import github
+
+async def run_prs(prs: int, fresh_client_per_call: bool) -> float:
+    start = time.perf_counter()
+    for number in range(1, prs + 1):
+        if fresh_client_per_call:
+            # Old behaviour: every service function opened its own client
+            await github.close_github_client()
+        pr = await github.get_github_pr("octo", "repo", number)
+        if fresh_client_per_call:
+            await github.close_github_client()
+        await github.get_potential_reviewers("octo", "repo", exclude_user=pr.author)
+    elapsed = time.perf_counter() - start
+    await github.close_github_client()
+    return elapsed
+
+async def main(prs: int, handshake_ms: float, latency_ms: float):
+    results = {}
+    for mode, fresh in (("per_call_clients", True), ("pooled_client", False)):
+        server = StubServer(github_handler(latency_ms / 1000), connect_delay=handshake_ms / 1000)
+        async with server:
+            os.environ["GITHUB_API_URL"] = server.url
+            elapsed = await run_prs(prs, fresh)
+        results[mode] = {
+            "connections": server.connections,
+            "requests": server.requests,
+            "handshakes_per_pr": round(server.connections / prs, 3),
+            "ms_per_pr": round(elapsed * 1000 / prs, 2),
+        }
+
+    saved = results["per_call_clients"]["handshakes_per_pr"] - results["pooled_client"]["handshakes_per_pr"]
+    results["handshakes_saved_per_pr"] = round(saved, 3)
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--prs", type=int, default=50)
+    parser.add_argument("--handshake-ms", type=float, default=30.0)
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.prs, args.handshake_ms, args.latency_ms))
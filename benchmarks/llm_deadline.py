@@ -0,0 +1,129 @@
+"""
+Check that a slow model neither stalls the event loop nor the answer.
+
+The model is a pydantic-ai FunctionModel that sleeps `--model-ms` before
+answering. While `--prs` analyses run at once (more than LLM_MAX_CONCURRENCY,
+so some wait for a slot), a ticker measures how late the event loop wakes it
+up. With the model slower than `--timeout`, every analysis must come back by
+the deadline as the rule-based `analyze_pr` result; with a fast model, the
+model's answer must be used. Exits 1 if any check fails.
+
+    python -m benchmarks.llm_deadline --model-ms 3000 --timeout 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+# Any key enables the LLM path; the model itself is replaced below
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+from pydantic_ai.models.function import FunctionModel
+
+from src.app.agents import pr_agent
+from src.app.models import PRMetadata
+from src.app.services.signals import analyze_pr
+
+MODEL_SUMMARY = "Slow model analysis."
+
+class SlowModel:
+    """Answers structured-output calls with a canned analysis after `delay` seconds."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.calls = 0
+
+    async def respond(self, messages, info) -> ModelResponse:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        analysis = {"summary": MODEL_SUMMARY, "signals": [], "suggested_reviewers": [], "improvement_hints": []}
+        return ModelResponse(parts=[ToolCallPart(tool_name=info.result_tools[0].name, args=analysis)])
+
+async def ticker(interval: float, lags: list, stop: asyncio.Event):
+    """Record how much later than asked each `interval` sleep returns."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+def sample_prs(count: int) -> list:
+    # Distinct PRs, so the analysis cache doesn't coalesce them into one call
+    return [
+        PRMetadata(
+            title=f"Add feature {i}",
+            description="Adds a feature.",
+            author=f"dev{i}",
+            created_at=datetime.now(timezone.utc),
+            files_changed=3,
+            lines_added=40 + i,
+            lines_removed=5,
+            repo_name="octo/repo",
+            pr_number=i + 1,
+            url=f"https://github.com/octo/repo/pull/{i + 1}",
+            changed_filenames=["src/app.py", "src/util.py", "README.md"],
+        )
+        for i in range(count)
+    ]
+
+async def run_scenario(model_delay: float, prs: list, tick_interval: float) -> dict:
+    model = SlowModel(model_delay)
+    pr_agent.analysis_cache.clear()
+    lags, stop = [], asyncio.Event()
+    ticking = asyncio.create_task(ticker(tick_interval, lags, stop))
+    start = time.perf_counter()
+    with pr_agent.get_agent().override(model=FunctionModel(model.respond)):
+        analyses = await asyncio.gather(*(pr_agent.get_pr_analysis(pr, ["alice"]) for pr in prs))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await ticking
+    return {
+        "model_ms": round(model_delay * 1000),
+        "model_calls": model.calls,
+        "elapsed_s": round(elapsed, 3),
+        "ticks": len(lags),
+        "max_tick_lag_ms": round(max(lags, default=0) * 1000, 1),
+        "llm_analyses": sum(a.summary == MODEL_SUMMARY for a in analyses),
+        "rule_analyses": sum(
+            a.model_dump() == analyze_pr(pr, suggested_reviewers=["alice"]).model_dump()
+            for pr, a in zip(prs, analyses)
+        ),
+    }
+
+async def main(args) -> list:
+    pr_agent.LLM_TIMEOUT_SECONDS = args.timeout
+    prs = sample_prs(args.prs)
+    # Build the agent and its schemas first, as the app's warm-up does
+    await run_scenario(0, sample_prs(1), args.tick_ms / 1000)
+    slow = await run_scenario(args.model_ms / 1000, prs, args.tick_ms / 1000)
+    fast = await run_scenario(args.timeout / 10, prs, args.tick_ms / 1000)
+    print(json.dumps({"prs": args.prs, "timeout_s": args.timeout, "slow_model": slow, "fast_model": fast}, indent=2))
+
+    failures = []
+    for name, result in (("slow_model", slow), ("fast_model", fast)):
+        if result["max_tick_lag_ms"] > args.max_lag_ms:
+            failures.append(f"{name}: event loop stalled for {result['max_tick_lag_ms']}ms")
+    # The deadline includes time queued for a model slot, so every PR is answered by then
+    if slow["elapsed_s"] > args.timeout + args.grace:
+        failures.append(f"slow_model: answered after {slow['elapsed_s']}s, deadline was {args.timeout}s")
+    if slow["rule_analyses"] != len(prs):
+        failures.append(f"slow_model: {len(prs) - slow['rule_analyses']} analyses weren't the analyze_pr fallback")
+    if fast["llm_analyses"] != len(prs):
+        failures.append(f"fast_model: {len(prs) - fast['llm_analyses']} analyses didn't use the model's answer")
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--prs", type=int, default=8, help="Analyses run at once")
+    parser.add_argument("--model-ms", type=float, default=3000, help="How long the slow model takes to answer")
+    parser.add_argument("--timeout", type=float, default=0.5, help="LLM_TIMEOUT_SECONDS for the run")
+    parser.add_argument("--tick-ms", type=float, default=10, help="Ticker interval")
+    parser.add_argument("--max-lag-ms", type=float, default=50, help="Most a tick may be late")
+    parser.add_argument("--grace", type=float, default=0.25, help="Allowed overrun of the deadline, in seconds")
+    failures = asyncio.run(main(parser.parse_args()))
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,136 @@
+"""
+Compare LLM prompt size, call count and latency for a multi-PR message:
+one call per PR with the full `pr.model_dump_json()` (the old prompts)
+versus token-budgeted prompts batched through `get_pr_analyses`.
+
+The model is a pydantic-ai FunctionModel that estimates the tokens of every
+prompt it gets and takes `--base-ms` plus `--ms-per-1k-tokens` to answer.
+`--drop-every N` makes it leave every Nth PR out of a batched answer, to
+exercise the per-PR fallback to the rules.
+
+    python -m benchmarks.llm_prompts --prs 6 --monorepo-files 5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from datetime import datetime, timezone
+
+# Any key enables the LLM path; the model itself is replaced below
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from pydantic_ai.messages import ModelResponse, ToolCallPart, UserPromptPart
+from pydantic_ai.models.function import FunctionModel
+
+from src.app.agents import pr_agent
+from src.app.agents.prompts import estimate_tokens
+from src.app.models import PRMetadata
+
+class TokenCountingModel:
+    """Answers structured-output calls with canned analyses and records each prompt's estimated size."""
+
+    def __init__(self, base_ms: float, ms_per_1k_tokens: float, drop_every: int = 0):
+        self.base = base_ms / 1000
+        self.per_token = ms_per_1k_tokens / 1e6
+        self.drop_every = drop_every
+        self.prompt_tokens = []
+
+    async def respond(self, messages, info) -> ModelResponse:
+        prompt = "".join(
+            part.content for message in messages for part in message.parts if isinstance(part, UserPromptPart)
+        )
+        tokens = estimate_tokens(prompt)
+        self.prompt_tokens.append(tokens)
+        await asyncio.sleep(self.base + tokens * self.per_token)
+
+        analysis = {
+            "summary": "Fake analysis.",
+            "signals": [],
+            "suggested_reviewers": [],
+            "improvement_hints": ["Split this PR."],
+        }
+        tool = info.result_tools[0]
+        if "analyses" in tool.parameters_json_schema.get("properties", {}):
+            count = prompt.count('"index":')
+            kept = [i for i in range(count) if not (self.drop_every and (i + 1) % self.drop_every == 0)]
+            args = {"analyses": [{"index": i, **analysis} for i in kept]}
+        else:
+            args = analysis
+        return ModelResponse(parts=[ToolCallPart(tool_name=tool.name, args=args)])
+
+def synthetic_prs(count: int, monorepo_files: int, description_chars: int, seed: int) -> list:
+    rng = random.Random(seed)
+    prs = []
+    for i in range(count):
+        # Every other PR is a monorepo-sized change
+        files = monorepo_files if i % 2 == 0 else rng.randint(3, 30)
+        filenames = [
+            f"services/svc{rng.randrange(40)}/src/{rng.choice(['api', 'core', 'db'])}/module_{j}.{rng.choice(['py', 'ts', 'go', 'md'])}"
+            for j in range(files)
+        ]
+        prs.append(PRMetadata(
+            title=f"Refactor service layer part {i}",
+            description=" ".join(rng.choice(["change", "the", "service", "handler", "to", "use", "new", "client"])
+                                 for _ in range(description_chars // 6)),
+            author=f"dev{i}",
+            created_at=datetime.now(timezone.utc),
+            files_changed=files,
+            lines_added=files * 12,
+            lines_removed=files * 4,
+            labels=["refactor"],
+            repo_name="octo/monorepo",
+            pr_number=1000 + i,
+            url=f"https://github.com/octo/monorepo/pull/{1000 + i}",
+            changed_filenames=filenames,
+        ))
+    return prs
+
+async def per_pr_full_json(items: list):
+    # The prompt as it was built before the token budget
+    async def one(pr, reviewers):
+        async with pr_agent._llm_semaphore:
+            await pr_agent.get_agent().run(
+                f"Analyze this PR: {pr.model_dump_json()}. Suggested reviewers already found: {reviewers}"
+            )
+    await asyncio.gather(*(one(pr, reviewers) for pr, reviewers in items))
+
+async def run_mode(name: str, items: list, args) -> dict:
+    model = TokenCountingModel(args.base_ms, args.ms_per_1k_tokens, args.drop_every)
+    pr_agent.analysis_cache.clear()
+    start = time.perf_counter()
+    with pr_agent.get_agent().override(model=FunctionModel(model.respond)):
+        if name == "per_pr_full_json":
+            await per_pr_full_json(items)
+            llm_analyses = len(items)
+        else:
+            analyses = await pr_agent.get_pr_analyses(items)
+            llm_analyses = sum(a.summary == "Fake analysis." for a in analyses)
+    return {
+        "calls": len(model.prompt_tokens),
+        "prompt_tokens_total": sum(model.prompt_tokens),
+        "prompt_tokens_max": max(model.prompt_tokens),
+        "llm_analyses": llm_analyses,
+        "rule_fallbacks": len(items) - llm_analyses,
+        "elapsed_s": round(time.perf_counter() - start, 3),
+    }
+
+async def main(args):
+    prs = synthetic_prs(args.prs, args.monorepo_files, args.description_chars, args.seed)
+    items = [(pr, ["alice", "bob"]) for pr in prs]
+    results = {"prs": args.prs, "batch_size": pr_agent.LLM_BATCH_SIZE, "pr_token_budget": pr_agent.LLM_PR_TOKEN_BUDGET}
+    for name in ("per_pr_full_json", "budgeted_batched"):
+        results[name] = await run_mode(name, items, args)
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--prs", type=int, default=6)
+    parser.add_argument("--monorepo-files", type=int, default=5000, help="Changed files in every other PR")
+    parser.add_argument("--description-chars", type=int, default=20000)
+    parser.add_argument("--base-ms", type=float, default=300, help="Fixed model latency per call")
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=20, help="Extra latency per 1k prompt tokens")
+    parser.add_argument("--drop-every", type=int, default=0, help="Leave every Nth PR out of batched answers")
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,301 @@
+"""
+Load test /slack/events and the analyze endpoints against local stand-ins
+for GitHub, Slack and Gemini.
+
+The app runs under uvicorn in this process, with GITHUB_API_URL,
+SLACK_API_URL and GEMINI_API_URL pointed at stub servers whose latency,
+5xx rate and 429 rate are configurable. Slack events (single- and multi-PR
+messages) arrive open-loop at `--rate` per second; latencies are measured
+from each event's scheduled send time, so a stalled server shows up in the
+tail instead of slowing the stream down. The report is JSON; with
+`--baseline` it is compared to an earlier report and the exit status is 1
+if a latency percentile or throughput regressed by more than
+`--max-regression`.
+
+    python -m benchmarks.loadtest --events 300 --rate 50 --output report.json
+    python -m benchmarks.loadtest --baseline report.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.stubs import FaultInjector, GeminiStub, SlackStub, StubServer, github_handler
+
+def percentiles(values: list) -> dict:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    ordered = sorted(values)
+
+    def rank(q):
+        # Nearest-rank percentile
+        return round(ordered[min(len(ordered) - 1, max(0, int(q * len(ordered) + 0.5) - 1))], 2)
+
+    return {"p50": rank(0.50), "p95": rank(0.95), "p99": rank(0.99), "max": round(ordered[-1], 2)}
+
+def slack_event(i: int, rng: random.Random, args) -> dict:
+    count = rng.randint(2, args.max_prs) if rng.random() < args.multi_pr_ratio else 1
+    links = [
+        f"https://github.com/octo/repo{rng.randrange(args.repos)}/pull/{rng.randint(1, args.pr_pool)}"
+        for _ in range(count)
+    ]
+    return {
+        "type": "event_callback",
+        "event_id": f"EvLoad{i:08d}",
+        "event": {
+            "type": "message",
+            "channel": f"CLOAD{i % args.channels}",
+            "ts": f"1700000000.{i:06d}",
+            "text": "Could someone take a look? " + " ".join(links),
+        },
+    }
+
+async def replay_slack_events(client: httpx.AsyncClient, slack: SlackStub, args) -> dict:
+    rng = random.Random(args.seed)
+    events = [slack_event(i, rng, args) for i in range(args.events)]
+    sent_at = {}
+    ack_ms, errors = [], 0
+
+    async def send(event: dict, scheduled: float):
+        nonlocal errors
+        await asyncio.sleep(max(0.0, scheduled - time.monotonic()))
+        sent_at[event["event"]["ts"]] = scheduled
+        try:
+            response = await client.post("/slack/events", json=event)
+            response.raise_for_status()
+            ack_ms.append((time.monotonic() - scheduled) * 1000)
+        except Exception:
+            errors += 1
+
+    start = time.monotonic()
+    await asyncio.gather(*(send(event, start + i / args.rate) for i, event in enumerate(events)))
+    sending = time.monotonic() - start
+
+    # Wait for the threaded replies to come in. Multi-PR replies start as a
+    # placeholder that is edited (chat.update) until complete, so time both.
+    def replies() -> tuple:
+        first, last, thread_of = {}, {}, {}
+        for at, payload in slack.messages:
+            # The stub answers each post with its own receive time as the message ts
+            thread = payload.get("thread_ts") or thread_of.get(payload.get("ts"))
+            if thread not in sent_at:
+                continue
+            thread_of[f"{at:.6f}"] = thread
+            first.setdefault(thread, at)
+            last[thread] = at
+        return first, last
+
+    deadline = time.monotonic() + args.drain_timeout
+    while time.monotonic() < deadline:
+        before = len(slack.messages)
+        await asyncio.sleep(max(1.0, args.settle))
+        # Done once every thread has a reply and no edits are still coming
+        if len(replies()[0]) == len(sent_at) and len(slack.messages) == before:
+            break
+    first, last = replies()
+
+    reply_ms = [(at - sent_at[thread]) * 1000 for thread, at in first.items()]
+    complete_ms = [(at - sent_at[thread]) * 1000 for thread, at in last.items()]
+    return {
+        "sent": len(events),
+        "acked": len(ack_ms),
+        "errors": errors,
+        "prs_linked": sum(e["event"]["text"].count("/pull/") for e in events),
+        "duration_s": round(sending, 3),
+        "requests_per_s": round(len(ack_ms) / sending, 1) if sending else None,
+        "ack_ms": percentiles(ack_ms),
+        "replies": len(first),
+        "missing_replies": len(sent_at) - len(first),
+        "reply_ms": percentiles(reply_ms),
+        "complete_reply_ms": percentiles(complete_ms),
+    }
+
+async def hammer(client: httpx.AsyncClient, requests: list, concurrency: int) -> dict:
+    """Send (method, path, json) requests with `concurrency` in flight and time each one."""
+    latencies, errors = [], 0
+    queue = list(reversed(requests))
+
+    async def worker():
+        nonlocal errors
+        while queue:
+            method, path, body = queue.pop()
+            started = time.monotonic()
+            try:
+                response = await client.request(method, path, json=body)
+                response.raise_for_status()
+                latencies.append((time.monotonic() - started) * 1000)
+            except Exception:
+                errors += 1
+
+    start = time.monotonic()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.monotonic() - start
+    return {
+        "requests": len(requests),
+        "errors": errors,
+        "requests_per_s": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "latency_ms": percentiles(latencies),
+    }
+
+def analyze_requests(args) -> dict:
+    rng = random.Random(args.seed + 1)
+    github_requests = [
+        ("POST", f"/analyze/github/octo/repo{rng.randrange(args.repos)}/{rng.randint(1, args.pr_pool)}", None)
+        for _ in range(args.analyze_requests)
+    ]
+    metadata_requests = []
+    for i in range(args.analyze_requests):
+        number = rng.randint(1, args.pr_pool)
+        metadata_requests.append(("POST", "/analyze", {
+            "title": f"Load test PR {number}",
+            "author": f"author{number % 7}",
+            "created_at": "2026-01-01T00:00:00Z",
+            "files_changed": 12,
+            "lines_added": rng.randint(1, 900),
+            "lines_removed": rng.randint(0, 200),
+            "labels": ["feature"] if i % 3 == 0 else [],
+            "repo_name": f"octo/repo{rng.randrange(args.repos)}",
+            "pr_number": number,
+            "url": f"https://github.com/octo/repo0/pull/{number}",
+            "changed_filenames": [f"src/module_{j}.py" for j in range(12)],
+        }))
+    return {"analyze_github": github_requests, "analyze": metadata_requests}
+
+def compare(report: dict, baseline: dict, max_regression: float) -> list:
+    """Latency percentiles that grew, or throughput that dropped, by more than `max_regression`."""
+    regressions = []
+    for section, current in report.items():
+        before = baseline.get(section)
+        if not isinstance(current, dict) or not isinstance(before, dict):
+            continue
+        for key in ("ack_ms", "reply_ms", "complete_reply_ms", "latency_ms"):
+            for q in ("p50", "p95", "p99"):
+                new, old = (current.get(key) or {}).get(q), (before.get(key) or {}).get(q)
+                if new is not None and old and new > old * (1 + max_regression):
+                    regressions.append(f"{section}.{key}.{q}: {old} -> {new}")
+        new, old = current.get("requests_per_s"), before.get("requests_per_s")
+        if new is not None and old and new < old * (1 - max_regression):
+            regressions.append(f"{section}.requests_per_s: {old} -> {new}")
+    return regressions
+
+async def run(args) -> dict:
+    github = FaultInjector(
+        github_handler(args.github_latency_ms / 1000, args.files_per_pr),
+        error_rate=args.github_error_rate, rate_limit_rate=args.github_429_rate, seed=args.seed,
+    )
+    slack = SlackStub(rate_per_channel=args.slack_rate_per_channel, latency=args.slack_latency_ms / 1000)
+    slack_faults = FaultInjector(slack, error_rate=args.slack_error_rate, seed=args.seed)
+    gemini = GeminiStub(latency=args.llm_latency_ms / 1000)
+    gemini_faults = FaultInjector(gemini, error_rate=args.llm_error_rate, rate_limit_rate=args.llm_429_rate, seed=args.seed)
+
+    tmp = tempfile.TemporaryDirectory()
+    async with StubServer(github) as github_server, StubServer(slack_faults) as slack_server, \
+            StubServer(gemini_faults) as gemini_server:
+        # The app reads its configuration at import time
+        os.environ.update({
+            "DATABASE_URL": f"sqlite:///{tmp.name}/loadtest.db",
+            "GITHUB_API_URL": github_server.url,
+            "GITHUB_TOKEN": "loadtest",
+            "SLACK_API_URL": slack_server.url,
+            "SLACK_BOT_TOKEN": "xoxb-loadtest",
+            "GEMINI_API_URL": gemini_server.url + "/v1beta",
+        })
+        if args.llm:
+            os.environ["GEMINI_API_KEY"] = "loadtest"
+        else:
+            os.environ.pop("GEMINI_API_KEY", None)
+        os.environ.pop("SLACK_WEBHOOK_URL", None)
+
+        import uvicorn
+        from src.app.main import app
+
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning"))
+        serving = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.01)
+        port = server.servers[0].sockets[0].getsockname()[1]
+
+        report = {"config": vars(args)}
+        limits = httpx.Limits(max_connections=args.client_connections)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            # Measure the warmed-up app; events sent earlier would only be buffered
+            while (await client.get("/readyz")).status_code != 200:
+                await asyncio.sleep(0.05)
+            report["slack_events"] = await replay_slack_events(client, slack, args)
+            for name, requests in analyze_requests(args).items():
+                report[name] = await hammer(client, requests, args.analyze_concurrency)
+
+        server.should_exit = True
+        await serving
+
+        report["stubs"] = {
+            "github_requests": github_server.requests,
+            "github_connections": github_server.connections,
+            "github_injected_5xx": github.errors,
+            "github_injected_429": github.rate_limited,
+            "slack_messages": len(slack.messages),
+            "slack_429": slack.rate_limited,
+            "slack_injected_5xx": slack_faults.errors,
+            "llm_calls": gemini.calls,
+            "llm_injected_5xx": gemini_faults.errors,
+            "llm_injected_429": gemini_faults.rate_limited,
+        }
+    tmp.cleanup()
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=200, help="Slack events to replay")
+    parser.add_argument("--rate", type=float, default=40.0, help="Slack events per second (open loop)")
+    parser.add_argument("--multi-pr-ratio", type=float, default=0.3, help="Share of messages linking several PRs")
+    parser.add_argument("--max-prs", type=int, default=5, help="Most PRs linked from one message")
+    parser.add_argument("--channels", type=int, default=20)
+    parser.add_argument("--repos", type=int, default=10)
+    parser.add_argument("--pr-pool", type=int, default=500, help="Distinct PR numbers per repo (smaller = more cache hits)")
+    parser.add_argument("--files-per-pr", type=int, default=20)
+    parser.add_argument("--analyze-requests", type=int, default=100, help="Requests per analyze endpoint")
+    parser.add_argument("--analyze-concurrency", type=int, default=10)
+    parser.add_argument("--client-connections", type=int, default=200)
+    parser.add_argument("--drain-timeout", type=float, default=60.0, help="Seconds to wait for outstanding Slack replies")
+    parser.add_argument("--settle", type=float, default=2.0, help="Quiet seconds after which replies count as complete")
+    parser.add_argument("--github-latency-ms", type=float, default=30.0)
+    parser.add_argument("--github-error-rate", type=float, default=0.0)
+    parser.add_argument("--github-429-rate", type=float, default=0.0)
+    parser.add_argument("--slack-latency-ms", type=float, default=20.0)
+    parser.add_argument("--slack-rate-per-channel", type=float, default=0.0, help="Stub-side Slack limit, 0 for none")
+    parser.add_argument("--slack-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm", action="store_true", help="Enable AI analysis against the Gemini stub")
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-429-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed relative slowdown vs the baseline")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["regressions"] = compare(report, json.load(f), args.max_regression)
+
+    body = json.dumps(report, indent=2)
+    if args.output:
+        # The app logs to stdout, so the file is the clean copy
+        with open(args.output, "w") as f:
+            f.write(body + "\n")
+    else:
+        print(body)
+    for regression in report.get("regressions", []):
+        print(f"Regression: {regression}", file=sys.stderr)
+    if report.get("regressions"):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Measure what the always-on instrumentation costs per recorded stage.
+
+Times an empty `with stage(...)` block (span + histogram sample), a bare
+histogram observation and a counter increment, and renders /metrics with
+a realistic number of series.
+
+    python -m benchmarks.metrics_overhead --iterations 200000
+"""
+import argparse
+import json
+import time
+
+from src.app.metrics import CACHE_REQUESTS, STAGE_SECONDS, render_metrics, stage
+
+def per_call_us(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return round((time.perf_counter() - start) * 1e6 / iterations, 3)
+
+def empty_stage():
+    with stage("bench.empty"):
+        pass
+
+def nested_stage():
+    with stage("bench.outer"):
+        with stage("bench.inner") as span:
+            span.outcome = "hit"
+
+def main(iterations: int):
+    results = {
+        "baseline_call_us": per_call_us(lambda: None, iterations),
+        "stage_us": per_call_us(empty_stage, iterations),
+        "nested_stages_us": per_call_us(nested_stage, iterations),
+        "histogram_observe_us": per_call_us(lambda: STAGE_SECONDS.observe(0.01, stage="bench", outcome="ok"), iterations),
+        "counter_inc_us": per_call_us(lambda: CACHE_REQUESTS.inc(cache="bench", outcome="hit"), iterations),
+    }
+    start = time.perf_counter()
+    body = render_metrics()
+    results["render_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    results["render_lines"] = body.count("\n")
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200000)
+    args = parser.parse_args()
+    main(args.iterations)
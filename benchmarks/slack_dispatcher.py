@@ -0,0 +1,145 @@
+"""
+Check the outbound Slack dispatcher against the stub Slack server.
+
+`pacing`: a stub that never rate limits records when each message arrives;
+every channel must stay within the dispatcher's token bucket (`--burst`,
+then `--rate` per second), with channels paced independently.
+
+`retry_after`: a stub stricter than the dispatcher answers 429 with
+Retry-After; after each 429 the next attempt on that channel must wait at
+least Retry-After, and every message must still arrive, in order.
+
+In both, `submit()` must return without waiting. Exits 1 if any check fails.
+
+    python -m benchmarks.slack_dispatcher --channels 3 --messages 6
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import defaultdict
+
+from benchmarks.stubs import SlackStub, StubServer
+from src.app.services.slack import SlackDispatcher
+
+# Slack of the timers and the local round trip
+TOLERANCE = 0.05
+
+class RecordingSlack:
+    """Wraps SlackStub and keeps (time, status) of every request per channel, 429s included."""
+
+    def __init__(self, stub: SlackStub):
+        self.stub = stub
+        self.requests = defaultdict(list)
+
+    async def __call__(self, method, path, query, headers, body):
+        status, resp_headers, resp_body = await self.stub(method, path, query, headers, body)
+        channel = json.loads(body or b"{}").get("channel", "webhook")
+        self.requests[channel].append((time.monotonic(), status))
+        return status, resp_headers, resp_body
+
+async def run_scenario(stub: SlackStub, dispatcher: SlackDispatcher, channels: int, messages: int) -> dict:
+    recorder = RecordingSlack(stub)
+    async with StubServer(recorder) as server:
+        url = f"{server.url}/chat.postMessage"
+        start = time.monotonic()
+        futures = {
+            f"C{c}": [
+                dispatcher.submit(f"C{c}", url, {"channel": f"C{c}", "text": f"message {m}"})
+                for m in range(messages)
+            ]
+            for c in range(channels)
+        }
+        submit_ms = (time.monotonic() - start) * 1000
+        results = {channel: await asyncio.gather(*fs) for channel, fs in futures.items()}
+        elapsed = time.monotonic() - start
+        await dispatcher.close()
+
+    delivered = defaultdict(list)
+    for at, payload in stub.messages:
+        delivered[payload["channel"]].append((at - start, payload["text"]))
+    return {
+        "start": start,
+        "submit_ms": round(submit_ms, 2),
+        "elapsed_s": round(elapsed, 3),
+        "results": results,
+        "delivered": delivered,
+        "requests": recorder.requests,
+        "rate_limited": stub.rate_limited,
+    }
+
+def check_delivery(name: str, run: dict, messages: int, failures: list):
+    if run["submit_ms"] > 50:
+        failures.append(f"{name}: submitting took {run['submit_ms']}ms")
+    for channel, results in run["results"].items():
+        if not all(r and r.get("ok") for r in results):
+            failures.append(f"{name}: {sum(not (r and r.get('ok')) for r in results)} messages to {channel} were dropped")
+        texts = [text for _, text in run["delivered"][channel]]
+        if texts != [f"message {m}" for m in range(messages)]:
+            failures.append(f"{name}: {channel} got {len(texts)} messages, or out of order")
+
+async def main(args) -> list:
+    failures = []
+
+    # Pacing: the stub accepts everything, so only the dispatcher's bucket spaces the posts
+    pacing = await run_scenario(
+        SlackStub(rate_per_channel=0),
+        SlackDispatcher(rate_per_channel=args.rate, burst=args.burst),
+        args.channels, args.messages,
+    )
+    check_delivery("pacing", pacing, args.messages, failures)
+    for channel, delivered in pacing["delivered"].items():
+        for k, (at, _) in enumerate(delivered):
+            # The k-th message can't go out before the bucket has refilled for it
+            earliest = max(0, k + 1 - args.burst) / args.rate
+            if at < earliest - TOLERANCE:
+                failures.append(f"pacing: {channel} message {k} sent at {at:.3f}s, bucket allows {earliest:.3f}s")
+    # Channels have their own buckets, so they don't queue behind each other
+    expected = max(0, args.messages - args.burst) / args.rate
+    if pacing["elapsed_s"] > expected + 0.5:
+        failures.append(f"pacing: took {pacing['elapsed_s']}s, channels paced independently need {expected:.2f}s")
+
+    # Retry-After: the stub allows fewer posts than the dispatcher sends, so some get 429s
+    retry = await run_scenario(
+        SlackStub(rate_per_channel=args.slack_rate, retry_after=args.retry_after),
+        SlackDispatcher(rate_per_channel=args.slack_rate * 4, burst=args.burst, max_retries=args.messages * 4),
+        args.channels, args.messages,
+    )
+    check_delivery("retry_after", retry, args.messages, failures)
+    if not retry["rate_limited"]:
+        failures.append("retry_after: the stub never answered 429, nothing was checked")
+    waits = []
+    for channel, requests in retry["requests"].items():
+        for (at, status), (next_at, _) in zip(requests, requests[1:]):
+            if status == 429:
+                waits.append(next_at - at)
+                if next_at - at < args.retry_after - TOLERANCE:
+                    failures.append(f"retry_after: {channel} retried {next_at - at:.3f}s after a 429, Retry-After was {args.retry_after}s")
+
+    print(json.dumps({
+        "pacing": {
+            "rate": args.rate, "burst": args.burst, "submit_ms": pacing["submit_ms"], "elapsed_s": pacing["elapsed_s"],
+            "send_times_s": {c: [round(at, 3) for at, _ in d] for c, d in pacing["delivered"].items()},
+        },
+        "retry_after": {
+            "retry_after_s": args.retry_after, "submit_ms": retry["submit_ms"], "elapsed_s": retry["elapsed_s"],
+            "responses_429": retry["rate_limited"],
+            "min_wait_after_429_s": round(min(waits, default=0), 3),
+            "delivered": sum(len(d) for d in retry["delivered"].values()),
+        },
+    }, indent=2))
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--channels", type=int, default=3)
+    parser.add_argument("--messages", type=int, default=6, help="Messages per channel")
+    parser.add_argument("--rate", type=float, default=4.0, help="Dispatcher messages per second per channel")
+    parser.add_argument("--burst", type=int, default=2, help="Dispatcher burst per channel")
+    parser.add_argument("--slack-rate", type=float, default=2.0, help="Stub's per-channel limit in the retry_after run")
+    parser.add_argument("--retry-after", type=float, default=0.5, help="Retry-After the stub sends with a 429")
+    failures = asyncio.run(main(parser.parse_args()))
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    sys.exit(1 if failures else 0)
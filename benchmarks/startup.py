@@ -0,0 +1,118 @@
+"""
+Measure cold start: how long `import src.app.main` takes, and how soon a
+fresh `uvicorn` process answers /healthz, acks a Slack event and reports
+ready on /readyz.
+
+Each run starts a new process against a new SQLite database, so schema
+creation is part of every warm-up. Slack allows 3 seconds for the ack.
+
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --llm   # also set up the AI agent during warm-up
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+IMPORT_SNIPPET = (
+    "import sys, time; start = time.perf_counter(); import src.app.main; "
+    "print(time.perf_counter() - start, 'pydantic_ai' in sys.modules)"
+)
+
+SLACK_EVENT = {
+    "type": "event_callback",
+    "event_id": "EvStartup",
+    "event": {"type": "message", "channel": "CSTARTUP", "ts": "1700000000.000001",
+              "text": "https://github.com/octo/repo/pull/1"},
+}
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def app_env(tmp: str, llm: bool) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": f"sqlite:///{tmp}/startup.db",
+        # Nothing listens there; only the ack is measured, not the processing
+        "GITHUB_API_URL": "http://127.0.0.1:9",
+        "SLACK_API_URL": "http://127.0.0.1:9",
+    })
+    env.pop("SLACK_WEBHOOK_URL", None)
+    if llm:
+        env["GEMINI_API_KEY"] = "startup-benchmark"
+    else:
+        env.pop("GEMINI_API_KEY", None)
+    return env
+
+def measure_import(llm: bool) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        out = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET], env=app_env(tmp, llm),
+            capture_output=True, text=True, check=True,
+        ).stdout.split()
+    return {"import_s": float(out[-2]), "pydantic_ai_imported": out[-1] == "True"}
+
+def measure_startup(llm: bool, timeout: float) -> dict:
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "src.app.main:app", "--port", str(port), "--log-level", "warning"],
+            env=app_env(tmp, llm), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        result = {}
+        try:
+            with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=5) as client:
+                deadline = started + timeout
+                while "healthz_s" not in result and time.perf_counter() < deadline:
+                    try:
+                        client.get("/healthz").raise_for_status()
+                        result["healthz_s"] = time.perf_counter() - started
+                    except httpx.HTTPError:
+                        time.sleep(0.005)
+
+                sent = time.perf_counter()
+                client.post("/slack/events", json=SLACK_EVENT).raise_for_status()
+                result["first_ack_ms"] = (time.perf_counter() - sent) * 1000
+
+                while "readyz_s" not in result and time.perf_counter() < deadline:
+                    if client.get("/readyz").status_code == 200:
+                        result["readyz_s"] = time.perf_counter() - started
+                    else:
+                        time.sleep(0.005)
+        finally:
+            server.terminate()
+            server.wait()
+    return result
+
+def summarize(runs: list) -> dict:
+    summary = {}
+    for key in runs[0]:
+        values = [run[key] for run in runs if key in run]
+        if values and isinstance(values[0], bool):
+            summary[key] = all(values)
+        elif values:
+            summary[key] = {"median": round(statistics.median(values), 3), "max": round(max(values), 3)}
+    return summary
+
+def main(runs: int, llm: bool, timeout: float):
+    imports = [measure_import(llm) for _ in range(runs)]
+    startups = [measure_startup(llm, timeout) for _ in range(runs)]
+    print(json.dumps({"runs": runs, "llm": llm, **summarize(imports), **summarize(startups)}, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--llm", action="store_true", help="Configure a (dummy) Gemini key")
+    parser.add_argument("--timeout", type=float, default=60, help="Give up on a run after this many seconds")
+    args = parser.parse_args()
+    main(args.runs, args.llm, args.timeout)
@@ -0,0 +1,308 @@
+"""
+Minimal in-process HTTP stand-ins used by the benchmark scripts.
+
+The servers speak just enough HTTP/1.1 (keep-alive, Content-Length bodies)
+for httpx, and count accepted connections so the scripts can report how
+many handshakes a workload needed.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import time
+from datetime import datetime, timezone
+from typing import Callable, Awaitable, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+Handler = Callable[[str, str, dict, dict, bytes], Awaitable[Tuple[int, dict, bytes]]]
+
+class StubServer:
+    """Tiny asyncio HTTP server. `handler(method, path, query, headers, body)` returns (status, headers, body)."""
+
+    def __init__(self, handler: Handler, connect_delay: float = 0.0):
+        self.handler = handler
+        # Simulated cost of a fresh TCP+TLS handshake, paid once per connection
+        self.connect_delay = connect_delay
+        self.connections = 0
+        self.requests = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        return self
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        if self.connect_delay:
+            await asyncio.sleep(self.connect_delay)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode().split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, value = line.decode().split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+                body = b""
+                if "content-length" in headers:
+                    body = await reader.readexactly(int(headers["content-length"]))
+
+                parts = urlsplit(target)
+                query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+                self.requests += 1
+                status, resp_headers, resp_body = await self.handler(method, parts.path, query, headers, body)
+
+                head = [f"HTTP/1.1 {status} X"]
+                resp_headers = {"Content-Type": "application/json", **resp_headers}
+                resp_headers["Content-Length"] = str(len(resp_body))
+                head += [f"{k}: {v}" for k, v in resp_headers.items()]
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + resp_body)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+def json_response(payload, status: int = 200, headers: dict = None) -> Tuple[int, dict, bytes]:
+    return status, headers or {}, json.dumps(payload).encode()
+
+# Fixed per run so repeated fetches of a PR return identical bodies (and ETags)
+_CREATED_AT = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def fake_pr(owner: str, repo: str, number: int, files_per_pr: int = 3) -> dict:
+    return {
+        "title": f"Stub PR {number}",
+        "body": "Generated by the benchmark stub.",
+        "user": {"login": f"author{number % 7}"},
+        "created_at": _CREATED_AT,
+        "changed_files": files_per_pr,
+        "additions": 120,
+        "deletions": 15,
+        "labels": [{"name": "feature"}],
+        "state": "open",
+        "html_url": f"https://github.com/{owner}/{repo}/pull/{number}",
+        "head": {"sha": hashlib.sha1(f"{owner}/{repo}#{number}".encode()).hexdigest()},
+    }
+
+def with_etags(handler: Handler) -> Handler:
+    """Add strong ETags to 200 responses and answer matching If-None-Match with 304, like GitHub."""
+
+    async def handle(method, path, query, headers, body):
+        status, resp_headers, resp_body = await handler(method, path, query, headers, body)
+        if status == 200 and method == "GET":
+            etag = '"%s"' % hashlib.sha1(resp_body).hexdigest()
+            if headers.get("if-none-match") == etag:
+                return 304, {"ETag": etag}, b""
+            resp_headers = {**resp_headers, "ETag": etag}
+        return status, resp_headers, resp_body
+
+    return handle
+
+class FaultInjector:
+    """
+    Wraps a handler and fails a share of its requests: `error_rate` of them
+    with a 500, `rate_limit_rate` with a 429 carrying Retry-After (plus the
+    X-RateLimit headers GitHub sends), to see how retries and fallbacks hold
+    up under load.
+    """
+
+    def __init__(self, handler: Handler, error_rate: float = 0.0, rate_limit_rate: float = 0.0,
+                 retry_after: float = 1.0, seed: Optional[int] = None):
+        self.handler = handler
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.errors = 0
+        self.rate_limited = 0
+        self._random = random.Random(seed)
+
+    async def __call__(self, method, path, query, headers, body):
+        roll = self._random.random()
+        if roll < self.error_rate:
+            self.errors += 1
+            return json_response({"message": "Injected server error"}, status=500)
+        if roll < self.error_rate + self.rate_limit_rate:
+            self.rate_limited += 1
+            return json_response({"ok": False, "error": "ratelimited", "message": "Injected rate limit"}, status=429, headers={
+                "Retry-After": str(self.retry_after),
+                "X-RateLimit-Remaining": "0",
+                "X-RateLimit-Reset": str(int(time.time() + self.retry_after)),
+            })
+        return await self.handler(method, path, query, headers, body)
+
+class GeminiStub:
+    """
+    Answers generateContent calls the way Gemini does when pydantic-ai asks
+    for a structured result: a `final_result` function call with the args of
+    a PRAnalysisOutput, or one per PR in `analyses` for a batched prompt.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+
+    async def __call__(self, method, path, query, headers, body):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if not path.endswith(":generateContent"):
+            return json_response({"error": {"code": 404, "message": "Not Found"}}, status=404)
+        analysis = {
+            "summary": "Stub analysis: a tidy change with a clear purpose.",
+            "signals": [],
+            "suggested_reviewers": [],
+            "improvement_hints": ["Add a short description of how this was tested."],
+        }
+        request = json.loads(body or b"{}")
+        tools = (request.get("tools") or {}).get("function_declarations") or [{}]
+        if "analyses" in tools[0].get("parameters", {}).get("properties", {}):
+            prompt = "".join(part.get("text", "") for c in request.get("contents", []) for part in c.get("parts", []))
+            analysis = {"analyses": [{"index": i, **analysis} for i in range(prompt.count('"index":'))]}
+        return json_response({
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"functionCall": {"name": "final_result", "args": analysis}}]},
+                "finishReason": "STOP",
+                "index": 0,
+                "safetyRatings": [],
+            }],
+            "usageMetadata": {"promptTokenCount": 400, "candidatesTokenCount": 60, "totalTokenCount": 460},
+        })
+
+def fake_filenames(count: int) -> list:
+    """`count` source files, with one test and one doc file at the very end."""
+    names = [f"src/pkg{i // 50}/module_{i}.py" for i in range(max(count - 2, 0))]
+    return names + ["tests/test_main.py", "docs/usage.md"][:count]
+
+def graphql_pr_node(owner: str, repo: str, number: int, files_per_pr: int, include_files: bool) -> dict:
+    """The REST fake_pr() reshaped the way the GraphQL `PRFields` fragment returns it."""
+    rest = fake_pr(owner, repo, number, files_per_pr)
+    node = {
+        "title": rest["title"],
+        "body": rest["body"],
+        "author": {"login": rest["user"]["login"]},
+        "createdAt": rest["created_at"],
+        "changedFiles": rest["changed_files"],
+        "additions": rest["additions"],
+        "deletions": rest["deletions"],
+        "state": rest["state"].upper(),
+        "url": rest["html_url"],
+        "headRefOid": rest["head"]["sha"],
+        "labels": {"nodes": rest["labels"]},
+    }
+    if include_files:
+        names = fake_filenames(files_per_pr)
+        node["files"] = {
+            "pageInfo": {"hasNextPage": len(names) > 100},
+            "nodes": [{"path": n} for n in names[:100]],
+        }
+    return node
+
+def graphql_pr_response(body: bytes, files_per_pr: int) -> Tuple[int, dict, bytes]:
+    """
+    Answer the aliased PR queries built by services.github.build_pr_query.
+    Rather than parsing GraphQL, the stub reads the $o{i}/$r{i}/$n{i}
+    variables; repos named "missing" resolve to null with a NOT_FOUND error.
+    """
+    request = json.loads(body)
+    variables = request.get("variables", {})
+    include_files = "files(" in request["query"]
+    data, errors = {}, []
+    i = 0
+    while f"n{i}" in variables:
+        owner, repo, number = variables[f"o{i}"], variables[f"r{i}"], variables[f"n{i}"]
+        if repo == "missing":
+            data[f"pr{i}"] = None
+            errors.append({"type": "NOT_FOUND", "path": [f"pr{i}"], "message": "Could not resolve to a Repository"})
+        else:
+            data[f"pr{i}"] = {"pullRequest": graphql_pr_node(owner, repo, number, files_per_pr, include_files)}
+        i += 1
+    payload = {"data": data}
+    if errors:
+        payload["errors"] = errors
+    return json_response(payload)
+
+def github_handler(latency: float = 0.0, files_per_pr: int = 3) -> Handler:
+    """Handler serving the GitHub REST and GraphQL endpoints PR Whisperer reads."""
+
+    @with_etags
+    async def handle(method, path, query, headers, body):
+        if latency:
+            await asyncio.sleep(latency)
+        if method == "POST" and path == "/graphql":
+            return graphql_pr_response(body, files_per_pr)
+        parts = path.strip("/").split("/")
+        # /repos/{owner}/{repo}/...
+        if len(parts) >= 4 and parts[0] == "repos":
+            owner, repo = parts[1], parts[2]
+            if parts[3] == "contributors":
+                return json_response([
+                    {"login": f"dev{i}", "type": "User"} for i in range(10)
+                ])
+            if parts[3] == "pulls" and len(parts) >= 5:
+                number = int(parts[4])
+                if len(parts) == 5:
+                    return json_response(fake_pr(owner, repo, number, files_per_pr))
+                if parts[5] == "files":
+                    per_page = int(query.get("per_page", 30))
+                    page = int(query.get("page", 1))
+                    names = fake_filenames(files_per_pr)
+                    chunk = names[(page - 1) * per_page:page * per_page]
+                    link = {}
+                    if page * per_page < len(names):
+                        link["Link"] = f'<http://{headers["host"]}{path}?per_page={per_page}&page={page + 1}>; rel="next"'
+                    return json_response([{"filename": n} for n in chunk], headers=link)
+        return json_response({"message": "Not Found"}, status=404)
+
+    return handle
+
+class SlackStub:
+    """
+    Records chat.postMessage calls and answers 429 + Retry-After whenever a
+    channel is posted to faster than `rate_per_channel` messages per second.
+    """
+
+    def __init__(self, rate_per_channel: float = 1.0, retry_after: float = 1.0, latency: float = 0.0):
+        self.min_interval = 1.0 / rate_per_channel if rate_per_channel else 0.0
+        self.retry_after = retry_after
+        self.latency = latency
+        self.messages = []   # (monotonic time, payload)
+        self.rate_limited = 0
+        self._last_post: dict = {}
+
+    async def __call__(self, method, path, query, headers, body):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        payload = json.loads(body or b"{}")
+        channel = payload.get("channel", "webhook")
+        now = time.monotonic()
+        last = self._last_post.get(channel)
+        if last is not None and now - last < self.min_interval:
+            self.rate_limited += 1
+            return json_response({"ok": False, "error": "ratelimited"}, status=429,
+                                 headers={"Retry-After": str(self.retry_after)})
+        self._last_post[channel] = now
+        self.messages.append((now, payload))
+        return json_response({"ok": True, "channel": channel, "ts": f"{now:.6f}"})
@@ -0,0 +1,91 @@
+import asyncio
+import hashlib
+import json
+from typing import Awaitable, Callable, Dict, List, Optional
+from src.app.cache import LRUCache
+from src.app.models import PRMetadata, PRAnalysisOutput
+
+# The PRMetadata fields that actually shape the analysis. head_sha is there so
+# that any push, even one that keeps the file list and sizes, gets a new analysis.
+ANALYSIS_FIELDS = (
+    "title",
+    "description",
+    "author",
+    "changed_filenames",
+    "files_changed",
+    "lines_added",
+    "lines_removed",
+    "labels",
+    "head_sha",
+)
+
+def analysis_cache_key(pr: PRMetadata, suggested_reviewers: List[str], model_name: str, prompt_version: str) -> str:
+    """Content hash of everything that goes into one LLM analysis."""
+    payload = {
+        "pr": pr.model_dump(mode="json", include=set(ANALYSIS_FIELDS)),
+        "reviewers": suggested_reviewers or [],
+        "model": model_name,
+        "prompt": prompt_version,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+class AnalysisCache:
+    """
+    TTL/LRU cache of PRAnalysisOutput with single-flight coalescing: concurrent
+    requests for the same key share one in-flight computation.
+    """
+
+    def __init__(self, maxsize: int = 512, ttl: float = 3600):
+        self.results = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[PRAnalysisOutput]]) -> PRAnalysisOutput:
+        cached = self.results.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.coalesced += 1
+
+        # Shield so one caller going away doesn't cancel the call the others are waiting on
+        return await asyncio.shield(task)
+
+    def get(self, key: str) -> Optional[PRAnalysisOutput]:
+        """Plain lookup, for callers that compute several misses together."""
+        cached = self.results.get(key)
+        if cached is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return cached
+
+    def set(self, key: str, analysis: PRAnalysisOutput):
+        self.results.set(key, analysis)
+
+    def _finish(self, key: str, task: asyncio.Future):
+        self._inflight.pop(key, None)
+        # Failures are not cached, the next request simply tries again
+        if not task.cancelled() and task.exception() is None:
+            self.results.set(key, task.result())
+
+    def clear(self):
+        self.results.clear()
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "entries": len(self.results),
+            "in_flight": len(self._inflight),
+        }
@@ -1,20 +1,40 @@
 import os
-from typing import List
-from pydantic_ai import Agent
-from pydantic_ai.models.gemini import GeminiModel
-from src.app.models import PRMetadata, PRAnalysisOutput
+import asyncio
+from typing import Callable, List, Optional, Tuple
+from src.app.models import PRMetadata, PRAnalysisOutput, MultiPRAnalysisOutput
+from src.app.agents.prompts import build_batch_prompt, build_pr_prompt
 from src.app.services.signals import analyze_pr
+from src.app.agents.analysis_cache import AnalysisCache, analysis_cache_key
+from src.app.metrics import CACHE_REQUESTS, stage
+
+MODEL_NAME = 'gemini-1.5-flash'
+# Bump whenever the system prompt or the user prompt format changes, so cached analyses are not reused
+PROMPT_VERSION = "2"
 
 # Define the model. We check for the Gemini API key.
 gemini_key = os.getenv("GEMINI_API_KEY")
 
-if gemini_key:
-    model = GeminiModel('gemini-1.5-flash', api_key=gemini_key)
-else:
-    # Fallback or placeholder
-    model = 'google-gla:gemini-1.5-flash'
+_agent = None
 
 def get_agent():
+    """Build the agent once and reuse it for every analysis."""
+    global _agent
+    if _agent is None:
+        _agent = _build_agent()
+    return _agent
+
+def _build_agent():
+    # pydantic-ai is slow to import, so it is only loaded once an agent is needed (see the app's warm-up)
+    from pydantic_ai import Agent
+    from pydantic_ai.models.gemini import GeminiModel
+
+    if gemini_key:
+        # GEMINI_API_URL points the model at another endpoint (a proxy, or the benchmark stub)
+        gemini_url = os.getenv("GEMINI_API_URL", "https://generativelanguage.googleapis.com/v1beta")
+        model = GeminiModel(MODEL_NAME, api_key=gemini_key, url_template=gemini_url + "/models/{model}:")
+    else:
+        # Fallback or placeholder
+        model = f'google-gla:{MODEL_NAME}'
     return Agent(
         model,
         result_type=PRAnalysisOutput,
@@ -27,20 +47,130 @@ def get_agent():
         ),
     )
 
+# Cap on concurrent Gemini calls, and the deadline for one analysis (including time queued for a slot)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 4))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", 20))
+
+_llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+# Estimated prompt tokens per PR, and per batched call (PRs in a big batch get less each)
+LLM_PR_TOKEN_BUDGET = int(os.getenv("LLM_PR_TOKEN_BUDGET", 1000))
+LLM_BATCH_TOKEN_BUDGET = int(os.getenv("LLM_BATCH_TOKEN_BUDGET", 6000))
+# Most PRs analyzed in one call by get_pr_analyses; 1 turns batching off
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", 6))
+
+analysis_cache = AnalysisCache(
+    maxsize=int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", 512)),
+    ttl=float(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", 3600)),
+)
+
+async def run_agent_analysis(pr: PRMetadata, suggested_reviewers: List[str] = None) -> PRAnalysisOutput:
+    async with _llm_semaphore:
+        agent = get_agent()
+        with stage("llm.call", model=MODEL_NAME):
+            # We pass the PR data as a string to the agent, trimmed to the token budget
+            result = await agent.run(build_pr_prompt(pr, suggested_reviewers, LLM_PR_TOKEN_BUDGET))
+        return result.data
+
+async def run_batch_analysis(items: List[Tuple[PRMetadata, List[str]]]) -> List[Optional[PRAnalysisOutput]]:
+    """One LLM call for several PRs. A PR the model left out of its answer comes back as None."""
+    budget = min(LLM_PR_TOKEN_BUDGET, LLM_BATCH_TOKEN_BUDGET // len(items))
+    async with _llm_semaphore:
+        agent = get_agent()
+        with stage("llm.call", model=MODEL_NAME, prs=len(items)):
+            result = await agent.run(build_batch_prompt(items, budget), result_type=MultiPRAnalysisOutput)
+    by_index = {item.index: item for item in result.data.analyses}
+    return [
+        PRAnalysisOutput(**by_index[i].model_dump(exclude={"index"})) if i in by_index else None
+        for i in range(len(items))
+    ]
+
 # Use the AI agent for analysis if the API key is present
-def get_pr_analysis(pr: PRMetadata, suggested_reviewers: List[str] = None) -> PRAnalysisOutput:
-    if gemini_key:
-        try:
-            agent = get_agent()
-            # We pass the PR data as a string to the agent
-            result = agent.run_sync(
-                f"Analyze this PR: {pr.model_dump_json()}. "
-                f"Suggested reviewers already found: {suggested_reviewers}"
-            )
-            return result.data
-        except Exception as e:
-            print(f"AI Analysis failed, falling back to rules: {e}")
-    
-    # Fallback to rule-based logic if AI is not configured or fails
-    return analyze_pr(pr, suggested_reviewers=suggested_reviewers)
+async def get_pr_analysis(pr: PRMetadata, suggested_reviewers: List[str] = None) -> PRAnalysisOutput:
+    with stage("analysis") as span:
+        if gemini_key:
+            key = analysis_cache_key(pr, suggested_reviewers, MODEL_NAME, PROMPT_VERSION)
+            computed = False
+
+            def compute():
+                nonlocal computed
+                computed = True
+                return asyncio.wait_for(run_agent_analysis(pr, suggested_reviewers), timeout=LLM_TIMEOUT_SECONDS)
+
+            try:
+                # Identical PRs reuse a cached analysis, and concurrent requests share one LLM call
+                analysis = await analysis_cache.get_or_compute(key, compute)
+                span.outcome = "llm" if computed else "cache_hit"
+                CACHE_REQUESTS.inc(cache="analysis", outcome="miss" if computed else "hit")
+                return analysis
+            except asyncio.TimeoutError:
+                print(f"AI Analysis timed out after {LLM_TIMEOUT_SECONDS}s, falling back to rules")
+                span.outcome = "timeout_fallback"
+            except Exception as e:
+                print(f"AI Analysis failed, falling back to rules: {e}")
+                span.outcome = "error_fallback"
+        else:
+            span.outcome = "rules"
+
+        # Fallback to rule-based logic if AI is not configured, fails or misses the deadline
+        with stage("rules"):
+            return analyze_pr(pr, suggested_reviewers=suggested_reviewers)
+
+async def get_pr_analyses(items: List[Tuple[PRMetadata, List[str]]],
+                           on_result: Callable[[int, PRAnalysisOutput], None] = None) -> List[PRAnalysisOutput]:
+    """
+    Analyses for several (PR, suggested reviewers) pairs, in order. Cached
+    analyses are reused, and the rest go to the model LLM_BATCH_SIZE PRs per
+    call. A PR missing from the model's answer, or in a call that failed or
+    timed out, gets the rule-based analysis on its own. `on_result(i, analysis)`
+    is called for each item as soon as its analysis is ready.
+    """
+    results: List[Optional[PRAnalysisOutput]] = [None] * len(items)
+
+    def done(i: int, analysis: PRAnalysisOutput):
+        results[i] = analysis
+        if on_result:
+            on_result(i, analysis)
+
+    if not gemini_key or LLM_BATCH_SIZE <= 1 or len(items) <= 1:
+        async def analyze_one(i: int):
+            done(i, await get_pr_analysis(*items[i]))
+
+        await asyncio.gather(*(analyze_one(i) for i in range(len(items))))
+        return results
+
+    keys = [analysis_cache_key(pr, reviewers, MODEL_NAME, PROMPT_VERSION) for pr, reviewers in items]
+    todo = []
+    for i, key in enumerate(keys):
+        cached = analysis_cache.get(key)
+        CACHE_REQUESTS.inc(cache="analysis", outcome="miss" if cached is None else "hit")
+        if cached is None:
+            todo.append(i)
+        else:
+            done(i, cached)
+    groups = [todo[i:i + LLM_BATCH_SIZE] for i in range(0, len(todo), LLM_BATCH_SIZE)]
+
+    async def analyze_group(group: List[int]):
+        with stage("analysis.batch", prs=len(group)) as span:
+            try:
+                analyses = await asyncio.wait_for(run_batch_analysis([items[i] for i in group]), timeout=LLM_TIMEOUT_SECONDS)
+                span.outcome = "llm"
+            except asyncio.TimeoutError:
+                print(f"Batched AI analysis timed out after {LLM_TIMEOUT_SECONDS}s, falling back to rules")
+                analyses, span.outcome = [None] * len(group), "timeout_fallback"
+            except Exception as e:
+                print(f"Batched AI analysis failed, falling back to rules: {e}")
+                analyses, span.outcome = [None] * len(group), "error_fallback"
+
+            for i, analysis in zip(group, analyses):
+                if analysis is not None:
+                    analysis_cache.set(keys[i], analysis)
+                    done(i, analysis)
+                    continue
+                if span.outcome == "llm":
+                    span.outcome = "partial_fallback"
+                with stage("rules"):
+                    done(i, analyze_pr(items[i][0], suggested_reviewers=items[i][1]))
 
+    await asyncio.gather(*(analyze_group(group) for group in groups))
+    return results
@@ -0,0 +1,118 @@
+"""
+Prompt building for the PR analysis agent, held to a token budget per PR.
+
+Token counts are estimated at ~4 characters per token, close enough for
+English text and JSON to keep prompts bounded without a tokenizer. The PR
+fields that are always small go in as they are; the changed files get up to
+half of what is left (rolled up by directory once the plain list doesn't
+fit) and the description the rest (truncated).
+"""
+import json
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+from src.app.models import PRMetadata
+
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def _json(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+def truncate_text(text: str, max_tokens: int) -> str:
+    """`text` cut to about `max_tokens`, at a word boundary, with a note of how much was dropped."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    limit = max(0, max_tokens * CHARS_PER_TOKEN - 40)
+    cut = text[:limit]
+    if " " in cut[limit // 2:]:
+        cut = cut[:cut.rindex(" ")]
+    return f"{cut.rstrip()} … [truncated, {len(text) - len(cut)} more chars]"
+
+def _rollup(filenames: Sequence[str], depth: int) -> List[Tuple[str, int, Counter]]:
+    """(directory prefix, file count, extension counts) per directory, biggest first."""
+    groups: Dict[str, Tuple[int, Counter]] = {}
+    for name in filenames:
+        parts = name.split("/")
+        directory = "/".join(parts[:min(depth, len(parts) - 1)]) or "(root)"
+        base = parts[-1]
+        extension = base[base.rindex("."):] if "." in base[1:] else base
+        count, extensions = groups.get(directory, (0, Counter()))
+        extensions[extension] += 1
+        groups[directory] = (count + 1, extensions)
+    return sorted(((d, c, e) for d, (c, e) in groups.items()), key=lambda g: (-g[1], g[0]))
+
+def _describe(directory: str, count: int, extensions: Counter) -> str:
+    top = ", ".join(f"{ext} {n}" for ext, n in extensions.most_common(3))
+    if len(extensions) > 3:
+        top += ", …"
+    suffix = "/" if directory != "(root)" else ""
+    return f"{directory}{suffix} ({count} files: {top})"
+
+def summarize_filenames(filenames: Sequence[str], max_tokens: int) -> List[str]:
+    """
+    The changed files as they are if they fit in `max_tokens`, otherwise one
+    line per directory (the deepest level that fits) with its file count and
+    most common extensions. If even the top-level directories don't fit, the
+    biggest are kept and the rest counted.
+    """
+    filenames = list(filenames)
+    if estimate_tokens(_json(filenames)) <= max_tokens:
+        return filenames
+    for depth in (3, 2, 1):
+        lines = [_describe(*group) for group in _rollup(filenames, depth)]
+        if estimate_tokens(_json(lines)) <= max_tokens:
+            return lines
+
+    kept, used = [], 2
+    groups = _rollup(filenames, 1)
+    for group in groups:
+        line = _describe(*group)
+        # Room for the closing "… N more" line
+        if used + estimate_tokens(_json(line)) + 12 > max_tokens:
+            break
+        kept.append(line)
+        used += estimate_tokens(_json(line)) + 1
+    rest = groups[len(kept):]
+    if rest:
+        kept.append(f"… {sum(c for _, c, _ in rest)} more files in {len(rest)} directories")
+    return kept
+
+def pr_prompt_fields(pr: PRMetadata, max_tokens: int) -> dict:
+    """The PR as a dict for the prompt, about `max_tokens` long once serialized."""
+    fields = {
+        "repo": pr.repo_name,
+        "number": pr.pr_number,
+        "title": truncate_text(pr.title, 60),
+        "author": pr.author,
+        "created_at": pr.created_at.isoformat(),
+        "state": pr.review_status,
+        "labels": pr.labels[:20],
+        "files_changed": pr.files_changed,
+        "lines_added": pr.lines_added,
+        "lines_removed": pr.lines_removed,
+    }
+    remaining = max_tokens - estimate_tokens(_json(fields))
+    fields["changed_files"] = summarize_filenames(pr.changed_filenames, max(remaining // 2, 0))
+    # The description gets whatever the files left over
+    remaining -= estimate_tokens(_json(fields["changed_files"])) + 10
+    fields["description"] = truncate_text(pr.description or "", max(remaining, 0))
+    return fields
+
+def build_pr_prompt(pr: PRMetadata, suggested_reviewers: List[str], max_tokens: int) -> str:
+    return (
+        f"Analyze this PR: {_json(pr_prompt_fields(pr, max_tokens))}. "
+        f"Suggested reviewers already found: {suggested_reviewers}"
+    )
+
+def build_batch_prompt(items: Sequence[Tuple[PRMetadata, List[str]]], max_tokens_per_pr: int) -> str:
+    """One prompt for several PRs; the model answers with an analysis per `index`."""
+    prs = [
+        {"index": i, **pr_prompt_fields(pr, max_tokens_per_pr), "suggested_reviewers": reviewers or []}
+        for i, (pr, reviewers) in enumerate(items)
+    ]
+    return (
+        f"Analyze each of these {len(prs)} PRs on its own. Return one entry per PR in `analyses`, "
+        f"with `index` set to the PR's index and the suggested reviewers already found for it: {_json(prs)}"
+    )
@@ -0,0 +1,47 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Tuple, TypeVar
+
+T = TypeVar("T")
+
+async def bounded_as_completed(
+    items: Iterable[T],
+    worker: Callable[[T], Awaitable[Any]],
+    concurrency: int,
+) -> AsyncIterator[Tuple[int, Any, BaseException]]:
+    """
+    Run `worker` over `items` with at most `concurrency` calls in flight and
+    yield (index, result, error) as each call finishes, in completion order.
+
+    New work is only started when the consumer asks for the next result, so a
+    slow consumer (e.g. a client reading a streamed response) holds back the
+    producer and at most `concurrency` results are ever buffered. Closing the
+    generator early cancels whatever is still running.
+    """
+    iterator = iter(enumerate(items))
+    running = {}
+
+    def start_next() -> bool:
+        try:
+            index, item = next(iterator)
+        except StopIteration:
+            return False
+        running[asyncio.ensure_future(worker(item))] = index
+        return True
+
+    try:
+        while len(running) < concurrency and start_next():
+            pass
+        while running:
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index = running.pop(task)
+                if task.cancelled():
+                    yield index, None, asyncio.CancelledError()
+                elif task.exception() is not None:
+                    yield index, None, task.exception()
+                else:
+                    yield index, task.result(), None
+                start_next()
+    finally:
+        for task in running:
+            task.cancel()
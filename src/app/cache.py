@@ -0,0 +1,119 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from src.app.metrics import CACHE_REQUESTS
+
+_MISSING = object()
+
+class LRUCache:
+    """Bounded in-process LRU map with an optional per-entry TTL (in seconds)."""
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key, _MISSING)
+        if item is _MISSING:
+            return default
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.pop(key, _MISSING)
+        return default if item is _MISSING else item[0]
+
+    def clear(self):
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+class StaleWhileRevalidateCache:
+    """
+    Async cache that keeps serving an entry past its `soft_ttl` while a
+    background task refreshes it. Entries older than `hard_ttl` are dropped
+    and the next caller waits for a fresh load. Loads for the same key are
+    coalesced.
+    """
+
+    def __init__(self, load: Callable[[Hashable], Awaitable[Any]], maxsize: int = 1024,
+                 soft_ttl: float = 3600, hard_ttl: float = 86400, name: str = "cache"):
+        # `load(key)` returns the value, or None for "don't cache this"
+        self.load = load
+        # Label for the cache request metrics
+        self.name = name
+        self.soft_ttl = soft_ttl
+        self.entries = LRUCache(maxsize=maxsize, ttl=hard_ttl)
+        self._loading: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    async def get(self, key: Hashable) -> Any:
+        entry = self.entries.get(key)
+        if entry is not None:
+            value, loaded_at = entry
+            if time.monotonic() - loaded_at > self.soft_ttl:
+                self.stale_hits += 1
+                CACHE_REQUESTS.inc(cache=self.name, outcome="stale")
+                self._start_load(key)
+            else:
+                self.hits += 1
+                CACHE_REQUESTS.inc(cache=self.name, outcome="hit")
+            return value
+
+        self.misses += 1
+        CACHE_REQUESTS.inc(cache=self.name, outcome="miss")
+        return await asyncio.shield(self._start_load(key))
+
+    async def refresh(self, key: Hashable) -> Any:
+        """Load `key` now (used for warm-up), sharing any load already running."""
+        return await asyncio.shield(self._start_load(key))
+
+    def invalidate(self, key: Hashable):
+        self.entries.pop(key)
+
+    def _start_load(self, key: Hashable) -> asyncio.Task:
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key))
+            self._loading[key] = task
+            task.add_done_callback(lambda _: self._loading.pop(key, None))
+        return task
+
+    async def _load(self, key: Hashable) -> Any:
+        try:
+            value = await self.load(key)
+        except Exception as e:
+            # Background refreshes have nobody to raise to; keep serving what we have
+            print(f"Cache load for {key} failed: {e}")
+            return None
+        if value is not None:
+            self.entries.set(key, (value, time.monotonic()))
+        return value
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "entries": len(self.entries),
+        }
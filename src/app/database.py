@@ -1,4 +1,6 @@
-from sqlalchemy import create_engine, Column, String, Integer, DateTime, Boolean
+from sqlalchemy import create_engine, delete, func, inspect, select, Column, String, Integer, DateTime, Boolean, Text, LargeBinary, Index
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import datetime
@@ -11,13 +13,47 @@ DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./pr_whisperer.db")
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
+# Sync engine, used for schema creation and scripts
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def _async_engine_args(url: str):
+    """Map DATABASE_URL onto its async driver (aiosqlite / asyncpg) plus engine kwargs."""
+    url = make_url(url)
+    kwargs = {"pool_pre_ping": True}
+    if url.drivername.startswith("sqlite"):
+        return url.set(drivername="sqlite+aiosqlite"), kwargs
+
+    if url.drivername.startswith("postgresql"):
+        url = url.set(drivername="postgresql+asyncpg")
+        # asyncpg doesn't understand libpq's sslmode query parameter (Supabase URLs carry it)
+        if "sslmode" in url.query:
+            kwargs["connect_args"] = {"ssl": url.query["sslmode"]}
+            url = url.difference_update_query(["sslmode"])
+    kwargs["pool_size"] = int(os.getenv("DB_POOL_SIZE", 5))
+    kwargs["max_overflow"] = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    kwargs["pool_recycle"] = int(os.getenv("DB_POOL_RECYCLE", 1800))
+    return url, kwargs
+
+# Async engine, used from request handlers and background tasks so DB round trips don't block the event loop
+_async_url, _async_kwargs = _async_engine_args(DATABASE_URL)
+async_engine = create_async_engine(_async_url, **_async_kwargs)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
+def utcnow() -> datetime.datetime:
+    """The current UTC time, naive: how every DateTime column is stored (SQLite doesn't keep the timezone)."""
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
 class PRReminder(Base):
     __tablename__ = "reminders"
+    __table_args__ = (
+        # One reminder per PR per Slack thread; a unique index, so init_db can add it to existing tables
+        Index("uq_reminders_pr_thread", "owner", "repo", "pr_number", "channel", "thread_ts", unique=True),
+        # Serves the scheduler's "unsent and due" query and its next-due lookup
+        Index("ix_reminders_due", "is_sent", "reminder_time"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     owner = Column(String)
@@ -28,6 +64,93 @@ class PRReminder(Base):
     reminder_time = Column(DateTime)
     is_sent = Column(Boolean, default=False)
 
+class GitHubResponseCache(Base):
+    """On-disk tier of the GitHub conditional-request cache."""
+    __tablename__ = "github_response_cache"
+
+    key = Column(String, primary_key=True)
+    etag = Column(String, nullable=True)
+    last_modified = Column(String, nullable=True)
+    headers = Column(Text)  # JSON-encoded subset of the response headers
+    body = Column(LargeBinary)
+    updated_at = Column(DateTime, default=utcnow)
+
+class ProcessedSlackEvent(Base):
+    """Slack events we've already accepted, so retried deliveries are ignored across workers."""
+    __tablename__ = "processed_slack_events"
+
+    key = Column(String, primary_key=True)
+    created_at = Column(DateTime, default=utcnow, index=True)
+
+class PRState(Base):
+    """Latest known state of a PR, kept current by GitHub `pull_request` webhooks."""
+    __tablename__ = "pr_states"
+
+    owner = Column(String, primary_key=True)
+    repo = Column(String, primary_key=True)
+    pr_number = Column(Integer, primary_key=True)
+    title = Column(String)
+    description = Column(Text, nullable=True)
+    author = Column(String)
+    state = Column(String)  # "open" or "closed", as in the REST API
+    merged = Column(Boolean, default=False)
+    created_at = Column(DateTime)
+    files_changed = Column(Integer)
+    lines_added = Column(Integer)
+    lines_removed = Column(Integer)
+    labels = Column(Text)  # JSON list
+    url = Column(String)
+    head_sha = Column(String)
+    # JSON list, filled on the first fetch after a push; webhooks don't carry the file list
+    changed_filenames = Column(Text, nullable=True)
+    # GitHub's updated_at of the event applied last, to drop late deliveries of older events
+    github_updated_at = Column(DateTime)
+    updated_at = Column(DateTime, default=utcnow)
+
+class Job(Base):
+    """A unit of background work (e.g. one Slack event), claimed by workers under a time-limited lease."""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Serves the workers' "runnable now" query
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String)
+    payload = Column(Text)  # JSON
+    status = Column(String, default="queued")  # queued, running, done or failed
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=5)
+    # Not picked up before this time; pushed back after a failed attempt
+    run_at = Column(DateTime, default=utcnow)
+    # Worker holding the job, and when its claim runs out if that worker stops renewing it
+    locked_by = Column(String, nullable=True)
+    lease_until = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+def _drop_duplicate_reminders():
+    """Keep the oldest reminder per PR per thread, so the unique index can be built on an older table."""
+    keep = (
+        select(func.min(PRReminder.id))
+        .group_by(PRReminder.owner, PRReminder.repo, PRReminder.pr_number, PRReminder.channel, PRReminder.thread_ts)
+    )
+    with engine.begin() as conn:
+        dropped = conn.execute(delete(PRReminder).where(PRReminder.id.not_in(keep))).rowcount
+    if dropped:
+        print(f"Dropped {dropped} duplicate reminders before adding uq_reminders_pr_thread")
+
 def init_db():
     Base.metadata.create_all(bind=engine)
+    # create_all skips tables that already exist, so add indexes introduced since then
+    existing = {index["name"] for index in inspect(engine).get_indexes(PRReminder.__tablename__)}
+    if "uq_reminders_pr_thread" not in existing:
+        _drop_duplicate_reminders()
+    for index in PRReminder.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
 
+if __name__ == "__main__":
+    # Schema setup as a separate deploy step: python -m src.app.database
+    init_db()
+    print(f"Database schema is up to date ({make_url(DATABASE_URL).render_as_string(hide_password=True)})")
@@ -0,0 +1,263 @@
+"""
+Durable job queue on the `jobs` table, and the worker pool that drains it.
+
+Request handlers only `enqueue()` a row and return. Workers, in the web
+process or in separate `python -m src.app.worker` processes, claim runnable
+jobs with a conditional UPDATE that also takes a lease. A worker keeps
+renewing the leases of the jobs it is running; if it dies, the lease runs
+out and another worker picks the job up again. A failed attempt is retried
+with exponential backoff until `max_attempts`, after which the row is kept
+as "failed" for inspection.
+"""
+import asyncio
+import contextvars
+import datetime
+import json
+import os
+import socket
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+from sqlalchemy import and_, delete, func, or_, select, update
+from src.app.database import AsyncSessionLocal, Job, utcnow
+from src.app.metrics import IN_FLIGHT, Counter, stage
+
+JobHandler = Callable[..., Awaitable[None]]
+
+JOBS_FINISHED = Counter(
+    "prwhisperer_jobs_finished_total",
+    "Job attempts by kind and outcome (done, retry, failed).",
+    ("kind", "outcome"),
+)
+
+MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 5))
+
+_handlers: Dict[str, JobHandler] = {}
+# (attempt, max_attempts) of the job the current task is running
+_current_attempt: contextvars.ContextVar[Optional[tuple]] = contextvars.ContextVar("job_attempt", default=None)
+
+def register_job(kind: str, handler: JobHandler):
+    """Run `handler(**payload)` for jobs of this kind."""
+    _handlers[kind] = handler
+
+def is_final_attempt() -> bool:
+    """
+    Whether a failure of the running job is final, so a handler knows when to
+    tell the user instead of leaving it to a retry. True outside of a job.
+    """
+    attempt = _current_attempt.get()
+    return attempt is None or attempt[0] >= attempt[1]
+
+async def enqueue(kind: str, payload: dict, max_attempts: Optional[int] = None) -> int:
+    """Store a job for the workers. `payload` must be JSON-serializable."""
+    now = utcnow()
+    async with AsyncSessionLocal() as db:
+        job = Job(
+            kind=kind,
+            payload=json.dumps(payload),
+            status="queued",
+            attempts=0,
+            max_attempts=max_attempts or MAX_ATTEMPTS,
+            run_at=now,
+            created_at=now,
+        )
+        db.add(job)
+        await db.commit()
+    # Workers in this process start on it right away; others find it on their next poll
+    job_workers.notify()
+    return job.id
+
+async def queue_stats() -> dict:
+    """Jobs per status, and how long the oldest waiting one has been queued."""
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(Job.status, func.count(), func.min(Job.created_at)).group_by(Job.status)
+        )).all()
+    counts = {status: count for status, count, _ in rows}
+    oldest = next((created for status, _, created in rows if status == "queued"), None)
+    return {
+        "counts": {status: counts.get(status, 0) for status in ("queued", "running", "done", "failed")},
+        "oldest_queued_seconds": round((utcnow() - oldest).total_seconds(), 1) if oldest else 0.0,
+        "running_here": len(job_workers.running),
+    }
+
+class JobWorkers:
+    """
+    Runs up to `concurrency` jobs at a time in this process.
+
+    It claims as many runnable jobs as it has free slots, then sleeps until
+    a slot frees up, a job is enqueued locally (`notify()`), or
+    `poll_interval` passes, so jobs enqueued by other processes are also
+    picked up.
+    """
+
+    def __init__(self, concurrency: int = 8, lease: float = 300, poll_interval: float = 1.0,
+                 retry_base: float = 5, retry_max: float = 600,
+                 retention: datetime.timedelta = datetime.timedelta(days=7), prune_interval: float = 3600):
+        self.concurrency = concurrency
+        # A job whose worker stops renewing it becomes runnable again this long after the last renewal
+        self.lease = datetime.timedelta(seconds=lease)
+        self.poll_interval = poll_interval
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        # Finished jobs are kept this long, then pruned
+        self.retention = retention
+        self.prune_interval = prune_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.running: Dict[int, asyncio.Task] = {}
+        self._last_prune: Optional[datetime.datetime] = None
+        self._wakeup = asyncio.Event()
+
+    def notify(self):
+        """Wake the pool so it claims again."""
+        self._wakeup.set()
+
+    async def run(self):
+        renewing = asyncio.create_task(self._renew_leases())
+        try:
+            while True:
+                self._wakeup.clear()
+                free = self.concurrency - len(self.running)
+                try:
+                    if free > 0:
+                        for job in await self._claim(free):
+                            self.running[job.id] = asyncio.create_task(self._run_job(job))
+                    await self._maybe_prune()
+                except Exception as e:
+                    print(f"Error in job worker loop: {e}")
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            renewing.cancel()
+            # Hand unfinished jobs back instead of leaving them locked until their lease runs out
+            interrupted = list(self.running)
+            for task in self.running.values():
+                task.cancel()
+            await asyncio.gather(*self.running.values(), return_exceptions=True)
+            if interrupted:
+                await self._release(interrupted)
+
+    async def _claim(self, limit: int) -> list:
+        now = utcnow()
+        runnable = or_(
+            and_(Job.status == "queued", Job.run_at <= now),
+            # The worker holding it died or hung
+            and_(Job.status == "running", Job.lease_until < now),
+        )
+        async with AsyncSessionLocal() as db:
+            ids = (await db.scalars(
+                select(Job.id).where(runnable).order_by(Job.run_at).limit(limit)
+            )).all()
+            if not ids:
+                return []
+            # Re-checking `runnable` means a job another worker claimed meanwhile is skipped
+            claimed = (await db.execute(
+                update(Job)
+                .where(Job.id.in_(ids), runnable)
+                .values(status="running", locked_by=self.worker_id, lease_until=now + self.lease, attempts=Job.attempts + 1)
+                .returning(Job.id, Job.kind, Job.payload, Job.attempts, Job.max_attempts)
+            )).all()
+            await db.commit()
+            return claimed
+
+    async def _run_job(self, job):
+        try:
+            with IN_FLIGHT.track(task="job"), stage(f"job.{job.kind}", job_id=job.id, attempt=job.attempts):
+                if job.attempts > job.max_attempts:
+                    # Its last attempt never finished (the worker died), so don't start another
+                    raise RuntimeError("lease expired during the final attempt")
+                handler = _handlers.get(job.kind)
+                if handler is None:
+                    raise LookupError(f"no handler registered for job kind {job.kind!r}")
+                # Each job runs in its own task, so this doesn't leak into other jobs
+                _current_attempt.set((job.attempts, job.max_attempts))
+                await handler(**json.loads(job.payload))
+        except asyncio.CancelledError:
+            # Released by run()
+            raise
+        except Exception as e:
+            await self._fail(job, e)
+        else:
+            await self._finish(job)
+        finally:
+            self.running.pop(job.id, None)
+            self.notify()
+
+    async def _finish(self, job):
+        JOBS_FINISHED.inc(kind=job.kind, outcome="done")
+        await self._update(job.id, status="done", finished_at=utcnow(), lease_until=None, last_error=None)
+
+    async def _fail(self, job, error: Exception):
+        message = f"{type(error).__name__}: {error}"[:2000]
+        if job.attempts >= job.max_attempts:
+            print(f"Job {job.id} ({job.kind}) failed for good after {job.attempts} attempts: {message}")
+            JOBS_FINISHED.inc(kind=job.kind, outcome="failed")
+            await self._update(job.id, status="failed", finished_at=utcnow(), lease_until=None, last_error=message)
+            return
+        delay = min(self.retry_max, self.retry_base * 2 ** (job.attempts - 1))
+        print(f"Job {job.id} ({job.kind}) failed, retrying in {delay:.0f}s: {message}")
+        JOBS_FINISHED.inc(kind=job.kind, outcome="retry")
+        await self._update(
+            job.id, status="queued", run_at=utcnow() + datetime.timedelta(seconds=delay),
+            locked_by=None, lease_until=None, last_error=message,
+        )
+
+    async def _update(self, job_id: int, **values):
+        # Only while we still hold the job; after a lost lease the new holder owns the row
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(update(Job).where(Job.id == job_id, Job.locked_by == self.worker_id).values(**values))
+                await db.commit()
+        except Exception as e:
+            # The lease runs out and the job is retried elsewhere
+            print(f"Failed to record the result of job {job_id}: {e}")
+
+    async def _release(self, job_ids: List[int]):
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(Job)
+                    .where(Job.id.in_(job_ids), Job.locked_by == self.worker_id, Job.status == "running")
+                    # An interrupted attempt doesn't count against the job
+                    .values(status="queued", attempts=Job.attempts - 1, locked_by=None, lease_until=None)
+                )
+                await db.commit()
+        except Exception as e:
+            print(f"Failed to release jobs {job_ids}: {e}")
+
+    async def _renew_leases(self):
+        while True:
+            await asyncio.sleep(self.lease.total_seconds() / 3)
+            if not self.running:
+                continue
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(
+                        update(Job)
+                        .where(Job.id.in_(list(self.running)), Job.locked_by == self.worker_id)
+                        .values(lease_until=utcnow() + self.lease)
+                    )
+                    await db.commit()
+            except Exception as e:
+                print(f"Failed to renew job leases: {e}")
+
+    async def _maybe_prune(self):
+        now = utcnow()
+        if self._last_prune and (now - self._last_prune).total_seconds() < self.prune_interval:
+            return
+        self._last_prune = now
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                delete(Job).where(Job.status.in_(("done", "failed")), Job.finished_at < now - self.retention)
+            )
+            await db.commit()
+        if result.rowcount:
+            print(f"Pruned {result.rowcount} finished jobs")
+
+job_workers = JobWorkers(
+    concurrency=int(os.getenv("JOB_CONCURRENCY", 8)),
+    lease=float(os.getenv("JOB_LEASE_SECONDS", 300)),
+    poll_interval=float(os.getenv("JOB_POLL_INTERVAL", 1.0)),
+    retention=datetime.timedelta(days=int(os.getenv("JOB_RETENTION_DAYS", 7))),
+)
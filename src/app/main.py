@@ -1,21 +1,41 @@
 import os
 import re
+import json
 import asyncio
-from datetime import datetime, timedelta, timezone
+import httpx
+from typing import Awaitable, Callable, List, Optional, Union
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Request, BackgroundTasks
-from src.app.database import init_db, SessionLocal, PRReminder
 
-# Load environment variables before importing other local modules
+# Load environment variables before importing local modules, which read their settings at import time
 load_dotenv()
 
-# Initialize Database
-init_db()
-
-from src.app.models import PRMetadata, PRAnalysisOutput
-from src.app.agents.pr_agent import get_pr_analysis
-from src.app.services.slack import send_slack_message, post_thread_reply
-from src.app.services.github import get_github_pr, get_potential_reviewers
+from fastapi import FastAPI, HTTPException, Request, BackgroundTasks
+from pydantic import TypeAdapter, ValidationError
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from sqlalchemy import text
+from src.app.database import init_db, AsyncSessionLocal, async_engine
+from src.app.models import PRMetadata, PRAnalysisOutput, PRReference, BatchAnalysisResult
+from src.app.batching import bounded_as_completed
+from src.app.jobs import enqueue as enqueue_job, is_final_attempt, job_workers, queue_stats, register_job
+from src.app.metrics import IN_FLIGHT, Gauge, render_metrics, stage
+from src.app.agents.pr_agent import LLM_BATCH_SIZE, gemini_key, get_agent, get_pr_analysis, get_pr_analyses
+from src.app.services.slack import ProgressiveReply, send_slack_message, dispatcher as slack_dispatcher
+from src.app.services.codeowners import get_ownership_index, get_code_owners
+from src.app.services.dedup import event_store, event_keys
+from src.app.services.github_ratelimit import GitHubRateLimited, governor as github_governor
+from src.app.services.pr_state import TRACKED_ACTIONS, DIFF_CHANGING_ACTIONS, apply_pull_request_event, verify_signature
+from src.app.services.reminders import reminder_scheduler, schedule_reminders
+from src.app.services.github import (
+    GRAPHQL_BATCH_SIZE,
+    get_github_prs,
+    get_potential_reviewers,
+    invalidate_pr_cache,
+    get_reviewer_candidates,
+    pick_reviewers,
+    start_github_client,
+    close_github_client,
+    warm_reviewer_cache,
+)
 
 app = FastAPI(title="PR Whisperer")
 
@@ -29,6 +49,164 @@ async def root():
     """
     return {"message": "PR Whisperer is active!", "status": "healthy"}
 
+# Schema creation on startup; turn off when it is run separately with `python -m src.app.database`
+DB_INIT_ON_STARTUP = os.getenv("DB_INIT_ON_STARTUP", "true").lower() == "true"
+# Slack events held while warming up; past this they are refused so Slack retries them later
+SLACK_WARMUP_BUFFER = int(os.getenv("SLACK_WARMUP_BUFFER", 1000))
+
+# Filled in by warm_up(); "llm" stays "disabled" without a Gemini key
+readiness = {"database": False, "llm": "pending" if gemini_key else "disabled"}
+_slack_buffer: List[tuple] = []
+
+async def check_database():
+    async with AsyncSessionLocal() as db:
+        await db.execute(text("SELECT 1"))
+
+async def warm_up():
+    """
+    Bring up what the app needs beyond the web server, after it is already
+    serving: the schema (retried until the database answers), the loops that
+    use it, and the AI agent. Slack events that came in meanwhile are queued
+    once the database is there.
+    """
+    llm = asyncio.create_task(_warm_llm()) if gemini_key else None
+    delay = 1
+    while True:
+        try:
+            if DB_INIT_ON_STARTUP:
+                await asyncio.to_thread(init_db)
+            await check_database()
+            break
+        except Exception as e:
+            print(f"Database not ready, retrying in {delay}s: {e}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+    readiness["database"] = True
+
+    app.state.reminder_task = asyncio.create_task(reminder_scheduler.run())
+    # Set JOB_WORKERS_IN_PROCESS=false when jobs are handled by `python -m src.app.worker` processes instead
+    if os.getenv("JOB_WORKERS_IN_PROCESS", "true").lower() == "true":
+        app.state.job_task = asyncio.create_task(job_workers.run())
+    # Preload reviewer candidates for busy repos
+    warm_repos = [r for r in os.getenv("GITHUB_WARM_REPOS", "").split(",") if r.strip()]
+    if warm_repos:
+        app.state.warm_task = asyncio.create_task(warm_reviewer_cache(warm_repos))
+
+    buffered = _slack_buffer[:]
+    _slack_buffer.clear()
+    if buffered:
+        print(f"Queueing {len(buffered)} Slack events received while warming up")
+    for data, matches, retry_num in buffered:
+        # These were acked already, so one failing must not cost the rest
+        try:
+            job = await accept_slack_event(data, matches, retry_num)
+            if job:
+                await process_multiple_prs(**job)
+        except Exception as e:
+            print(f"Failed to process buffered Slack event {data.get('event_id')}: {e}")
+    if llm:
+        await llm
+
+async def _warm_llm():
+    try:
+        # Imports pydantic-ai and builds the model, which would otherwise land on the first analysis
+        await asyncio.to_thread(get_agent)
+        readiness["llm"] = "ready"
+    except Exception as e:
+        # Analyses fall back to the rules, so this doesn't hold up readiness
+        print(f"Failed to set up the AI agent: {e}")
+        readiness["llm"] = "error"
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: the database is reachable and the AI agent (if configured) has been set up."""
+    status = dict(readiness)
+    ready = readiness["database"] and readiness["llm"] != "pending"
+    if ready:
+        try:
+            await asyncio.wait_for(check_database(), timeout=2)
+        except Exception as e:
+            status["database"] = False
+            status["error"] = str(e) or type(e).__name__
+            ready = False
+    status["status"] = "ready" if ready else "warming_up"
+    return JSONResponse(status, status_code=200 if ready else 503)
+
+GITHUB_QUOTA_REMAINING = Gauge(
+    "prwhisperer_github_quota_remaining",
+    "GitHub requests left per token and resource, as last reported by GitHub.",
+    ("token", "resource"),
+)
+SLACK_QUEUED = Gauge("prwhisperer_slack_queued_messages", "Slack posts waiting in the outbound queues.")
+JOBS = Gauge("prwhisperer_jobs", "Jobs in the durable queue, by status.", ("status",))
+JOB_OLDEST_QUEUED = Gauge("prwhisperer_job_oldest_queued_seconds", "Age of the oldest job still waiting to run.")
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint."""
+    # Point-in-time values are read at scrape time rather than tracked on every change
+    for budget in github_governor.stats()["budgets"]:
+        if budget["remaining"] is not None:
+            GITHUB_QUOTA_REMAINING.set(budget["remaining"], token=budget["token"], resource=budget["resource"])
+    SLACK_QUEUED.set(slack_dispatcher.pending())
+    if readiness["database"]:
+        try:
+            jobs = await queue_stats()
+        except Exception as e:
+            # The rest of the scrape is still worth having while the database is away
+            print(f"Failed to read job queue stats for /metrics: {e}")
+        else:
+            for status, count in jobs["counts"].items():
+                JOBS.set(count, status=status)
+            JOB_OLDEST_QUEUED.set(jobs["oldest_queued_seconds"])
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/jobs")
+async def jobs():
+    """Depth of the job queue, and the age of its oldest waiting job."""
+    return await queue_stats()
+
+@app.get("/github/rate-limit")
+async def github_rate_limit():
+    """Current GitHub quota per token, as seen in the last responses."""
+    return github_governor.stats()
+
+@app.post("/github/webhook")
+async def github_webhook(request: Request):
+    """Keep the local PR state current from `pull_request` events, so reminders and repeat analyses skip GitHub."""
+    body = await request.body()
+    secret = os.getenv("GITHUB_WEBHOOK_SECRET")
+    if not secret:
+        raise HTTPException(status_code=503, detail="GITHUB_WEBHOOK_SECRET is not configured")
+    if not verify_signature(secret, body, request.headers.get("X-Hub-Signature-256")):
+        raise HTTPException(status_code=401, detail="invalid signature")
+
+    event = request.headers.get("X-GitHub-Event")
+    if event == "ping":
+        return {"status": "pong"}
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        # e.g. a webhook configured with the application/x-www-form-urlencoded content type
+        raise HTTPException(status_code=400, detail="payload must be JSON")
+    if event != "pull_request" or not isinstance(payload, dict) or payload.get("action") not in TRACKED_ACTIONS:
+        return {"status": "ignored"}
+
+    # Redeliveries (after a timeout or an error here) are applied again: older events are
+    # skipped by their updated_at, so this is idempotent and a failed delivery isn't lost
+    action = payload["action"]
+    with stage("github.webhook", action=action) as span:
+        if not await apply_pull_request_event(action, payload):
+            span.outcome = "stale"
+        elif action in DIFF_CHANGING_ACTIONS:
+            await invalidate_pr_cache(payload["repository"]["owner"]["login"], payload["repository"]["name"], payload["number"])
+    return {"status": "ok"}
+
 @app.post("/slack/events")
 async def slack_events(request: Request, background_tasks: BackgroundTasks):
     try:
@@ -46,90 +224,212 @@ async def slack_events(request: Request, background_tasks: BackgroundTasks):
     event = data.get("event")
     if event and event.get("type") == "message" and not event.get("bot_id"):
         text = event.get("text", "")
-        channel = event.get("channel")
-        thread_ts = event.get("ts") # Current message timestamp acts as thread ID
         
         # Find ALL PR links in the message
         matches = re.findall(GITHUB_PR_REGEX, text)
         if matches:
-            # Process all PRs together in the background
-            background_tasks.add_task(
-                process_multiple_prs, 
-                matches, channel, thread_ts
-            )
+            retry_num = request.headers.get("X-Slack-Retry-Num")
+            if not readiness["database"]:
+                # Slack gives up after 3s, so ack now and queue the event once warm-up reaches the database
+                if len(_slack_buffer) >= SLACK_WARMUP_BUFFER:
+                    raise HTTPException(status_code=503, detail="warming up")
+                _slack_buffer.append((data, matches, retry_num))
+                return {"status": "ok"}
+            job = await accept_slack_event(data, matches, retry_num)
+            if job:
+                background_tasks.add_task(process_multiple_prs, **job)
             
     return {"status": "ok"}
 
+async def accept_slack_event(data: dict, matches: list, retry_num: Optional[str] = None) -> Optional[dict]:
+    """
+    Dedup a Slack message with PR links and queue it for the job workers.
+    Returns the job if it couldn't be queued and has to run in this process.
+    """
+    channel = data["event"].get("channel")
+    message_ts = data["event"].get("ts")
+    # Replies and reminders go to the thread the message is in, or start one on it
+    thread_ts = data["event"].get("thread_ts") or message_ts
+
+    # Slack redelivers events we ack late (X-Slack-Retry-Num); only the first delivery does any work
+    keys = event_keys(data.get("event_id"), channel, message_ts)
+    if keys and not await event_store.claim(keys):
+        print(f"Ignoring duplicate Slack event {data.get('event_id')} (retry {retry_num})")
+        return None
+
+    # The work is queued durably and done by the job workers, so a restart doesn't lose it
+    job = {"matches": matches, "channel": channel, "thread_ts": thread_ts, "trace_id": data.get("event_id")}
+    try:
+        await enqueue_job("slack_event", job)
+    except Exception as e:
+        # The event is already claimed, so a Slack retry would be dropped; run it here instead
+        print(f"Failed to queue Slack event {data.get('event_id')}, processing in-process: {e}")
+        return job
+    return None
+
 @app.on_event("startup")
 async def startup_event():
-    # Start the reminder checker loop
-    asyncio.create_task(reminder_checker_loop())
+    # Open the pooled GitHub client once for the lifetime of the app
+    await start_github_client()
+    # Everything that touches the database or loads the AI stack happens after the app is serving
+    app.state.reminder_task = None
+    app.state.job_task = None
+    app.state.warm_up_task = asyncio.create_task(warm_up())
 
-async def reminder_checker_loop():
-    while True:
-        db = SessionLocal()
+@app.on_event("shutdown")
+async def shutdown_event():
+    app.state.warm_up_task.cancel()
+    if app.state.reminder_task:
+        app.state.reminder_task.cancel()
+    if app.state.job_task:
+        # Waits for unfinished jobs to be handed back to the queue
+        app.state.job_task.cancel()
+        await asyncio.gather(app.state.job_task, return_exceptions=True)
+    await slack_dispatcher.close()
+    await close_github_client()
+    await async_engine.dispose()
+
+# Upper bound on PRs (or batches of PRs, see LLM_BATCH_SIZE) from a single Slack message processed at once
+PR_FANOUT_CONCURRENCY = int(os.getenv("PR_FANOUT_CONCURRENCY", 4))
+# Multi-PR messages get a placeholder reply right away, edited as each PR's analysis lands
+SLACK_PROGRESSIVE_REPLIES = os.getenv("SLACK_PROGRESSIVE_REPLIES", "true").lower() == "true"
+
+async def suggest_reviewers(pr_metadata: PRMetadata) -> List[str]:
+    owner, repo = pr_metadata.repo_name.split("/", 1)
+    with stage("reviewers"):
+        # Reviewer candidates and CODEOWNERS come from per-repo caches
+        candidates, ownership = await asyncio.gather(
+            get_reviewer_candidates(owner, repo),
+            get_ownership_index(owner, repo),
+        )
+        code_owners = ownership.rank_owners(pr_metadata.changed_filenames) if ownership else []
+        return pick_reviewers(candidates, exclude_user=pr_metadata.author, code_owners=code_owners)
+
+def llm_batch_size(prs: int) -> int:
+    """
+    PRs per model call for a message with `prs` PRs: every message with two
+    or more is batched, split evenly into as few calls of at most
+    LLM_BATCH_SIZE as possible.
+    """
+    if not gemini_key or prs < 2:
+        return 1
+    calls = -(-prs // max(1, LLM_BATCH_SIZE))
+    return -(-prs // calls)
+
+async def process_pr_batch(batch: List[PRMetadata], on_result: Callable[[int, tuple], None] = None) -> List[tuple]:
+    """
+    Analyze fetched PRs together, in one LLM call when batching is on. Returns
+    (pr_metadata, analysis) pairs; `on_result(i, pair)` gets each one as it's ready.
+    """
+    reviewers = await asyncio.gather(*(suggest_reviewers(pr_metadata) for pr_metadata in batch))
+    landed = (lambda i, analysis: on_result(i, (batch[i], analysis))) if on_result else None
+    analyses = await get_pr_analyses(list(zip(batch, reviewers)), on_result=landed)
+    return list(zip(batch, analyses))
+
+async def process_multiple_prs(matches: list, channel: str, thread_ts: str, trace_id: str = None):
+    """Process multiple PR links and send a single consolidated summary."""
+    # One trace per Slack event, so every stage below can be tied back to it
+    with IN_FLIGHT.track(task="slack_event"), stage("slack.event", trace_id=trace_id, prs=len(matches)):
+        await _process_multiple_prs(matches, channel, thread_ts)
+
+register_job("slack_event", process_multiple_prs)
+
+async def _process_multiple_prs(matches: list, channel: str, thread_ts: str):
+    matches = [(owner, repo, int(pr_number)) for owner, repo, pr_number in matches]
+    keys = list(dict.fromkeys(matches))
+    repos = list(dict.fromkeys((owner, repo) for owner, repo, _ in keys))
+    reply = ProgressiveReply(channel, thread_ts)
+    progressive = SLACK_PROGRESSIVE_REPLIES and len(keys) > 1
+
+    # All PRs come back in one GraphQL round trip; the per-repo caches are filled meanwhile
+    prs, *_ = await asyncio.gather(
+        get_github_prs(matches),
+        *(get_reviewer_candidates(owner, repo) for owner, repo in repos),
+        *(get_ownership_index(owner, repo) for owner, repo in repos),
+        return_exceptions=True,
+    )
+    if isinstance(prs, GitHubRateLimited):
+        # Say so rather than reporting valid PRs as missing
+        print(f"Failed to fetch PRs {matches}: {prs}")
+        await reply.finish(
+            f"🚦 GitHub's rate limit is used up right now, so I couldn't look at these PRs. "
+            f"Try again in about {max(1, round(prs.retry_after / 60))} min."
+        )
+        return
+    if isinstance(prs, Exception):
+        # Raised so the job is retried later. Nothing has been posted yet, so a retry
+        # doesn't leave a stale reply behind; only the last attempt tells the user.
+        print(f"Failed to fetch PRs {matches}: {prs}")
+        if is_final_attempt():
+            await reply.finish("⚠️ I couldn't reach GitHub for these PRs, so I can't analyze them right now.")
+        raise prs
+
+    # None marks a PR that couldn't be fetched or analyzed
+    results = {key: None for key in keys if not prs.get(key)}
+    found = [key for key in keys if prs.get(key)]
+    if progressive:
+        # Show which PRs were picked up right away, instead of waiting for the slowest one
+        reply.update(format_progress(keys, results))
+
+    def show(batch: list) -> Optional[Callable[[int, tuple], None]]:
+        """Puts each PR of `batch` in the reply as its analysis is parsed, before the rest of the batch is done."""
+        def on_result(position: int, pair: tuple):
+            results[batch[position]] = pair
+            # Coalesced by the reply, so a burst of finished PRs costs one edit
+            reply.update(format_progress(keys, results))
+        return on_result if progressive else None
+
+    batch_size = llm_batch_size(len(found))
+    batches = [found[i:i + batch_size] for i in range(0, len(found), batch_size)]
+    worker = lambda batch: process_pr_batch([prs[key] for key in batch], on_result=show(batch))
+    async for index, result, error in bounded_as_completed(batches, worker, PR_FANOUT_CONCURRENCY):
+        for position, key in enumerate(batches[index]):
+            if error is not None:
+                print(f"Failed to process PR {key[0]}/{key[1]}#{key[2]}: {error}")
+            results[key] = result[position] if error is None else None
+        if progressive and error is not None:
+            reply.update(format_progress(keys, results))
+
+    # In message order, so the summary lists PRs as they appeared
+    analyses = [results[key] for key in found if results[key] is not None]
+
+    if analyses:
         try:
-            now = datetime.now(timezone.utc).replace(tzinfo=None) # SQLite doesn't store timezone
-            due_reminders = db.query(PRReminder).filter(
-                PRReminder.reminder_time <= now,
-                PRReminder.is_sent == False
-            ).all()
-
-            for reminder in due_reminders:
-                # Re-fetch PR to see if it's still open
-                updated_pr = await get_github_pr(reminder.owner, reminder.repo, reminder.pr_number)
-                if updated_pr and updated_pr.review_status == "open":
-                    post_thread_reply(
-                        reminder.channel, 
-                        reminder.thread_ts, 
-                        text=f"⏰ Quick nudge! This PR is still open. Any blockers, @{updated_pr.author}?"
+            with stage("db.schedule_reminders"):
+                async with AsyncSessionLocal() as db:
+                    # Save Reminder to DB (2 days later) for each PR
+                    await schedule_reminders(
+                        db,
+                        [(*pr_metadata.repo_name.split("/", 1), pr_metadata.pr_number) for pr_metadata, _ in analyses],
+                        channel,
+                        thread_ts,
                     )
-                
-                reminder.is_sent = True
-                db.commit()
+                    await db.commit()
+            reminder_scheduler.notify()
         except Exception as e:
-            print(f"Error in reminder loop: {e}")
-        finally:
-            db.close()
-        
-        await asyncio.sleep(60 * 60) # Check once an hour
-
-async def process_multiple_prs(matches: list, channel: str, thread_ts: str):
-    """Process multiple PR links and send a single consolidated summary."""
-    analyses = []
-    db = SessionLocal()
-    
-    try:
-        for owner, repo, pr_number in matches:
-            pr_number = int(pr_number)
-            
-            # Fetch & Analyze each PR
-            pr_metadata = await get_github_pr(owner, repo, pr_number)
-            if pr_metadata:
-                reviewers = await get_potential_reviewers(owner, repo, exclude_user=pr_metadata.author)
-                analysis = get_pr_analysis(pr_metadata, suggested_reviewers=reviewers)
-                analyses.append((pr_metadata, analysis))
-                
-                # Save Reminder to DB (2 days later) for each PR
-                reminder_time = datetime.now() + timedelta(days=2)
-                new_reminder = PRReminder(
-                    owner=owner,
-                    repo=repo,
-                    pr_number=pr_number,
-                    channel=channel,
-                    thread_ts=thread_ts,
-                    reminder_time=reminder_time
-                )
-                db.add(new_reminder)
-        
-        db.commit()
-    finally:
-        db.close()
+            # Not worth a retry: it would post the whole reply again
+            print(f"Failed to schedule reminders for {channel}/{thread_ts}: {e}")
     
-    # Send a single consolidated message
+    # Send a single consolidated message (split into continuations if it is too long)
     if analyses:
-        consolidated_message = format_consolidated_summary(analyses)
-        post_thread_reply(channel, thread_ts, text=consolidated_message)
+        await reply.finish(format_consolidated_summary(analyses))
+    elif progressive:
+        await reply.finish("😕 I couldn't fetch or analyze any of these PRs.")
+
+def format_progress(keys: list, results: dict) -> str:
+    """The in-progress multi-PR reply: finished PRs in full, the others as a pending line."""
+    lines = [f"📦 *{len(keys)} PRs detected!* Analyzing… ({len(results)}/{len(keys)} done)\n"]
+    for i, key in enumerate(keys, 1):
+        owner, repo, pr_number = key
+        if key not in results:
+            lines.append(f"{'─' * 40}")
+            lines.append(f"⏳ *#{i} — {owner}/{repo}#{pr_number}*\n")
+        elif results[key] is None:
+            lines.append(f"{'─' * 40}")
+            lines.append(f"⚠️ *#{i} — {owner}/{repo}#{pr_number}* couldn't be analyzed\n")
+        else:
+            lines.extend(format_pr_section(i, *results[key]))
+    return "\n".join(lines)
 
 
 def format_consolidated_summary(analyses: list) -> str:
@@ -143,19 +443,7 @@ def format_consolidated_summary(analyses: list) -> str:
     lines = [f"📦 *{len(analyses)} PRs detected!* Here's the breakdown:\n"]
     
     for i, (pr_metadata, analysis) in enumerate(analyses, 1):
-        lines.append(f"{'─' * 40}")
-        lines.append(f"*#{i} — <{pr_metadata.url}|{pr_metadata.title}>*")
-        lines.append(f"👤 Author: `{pr_metadata.author}` | 📊 +{pr_metadata.lines_added}/-{pr_metadata.lines_removed}")
-        lines.append(f"📝 {analysis.summary}")
-        
-        # Show detected signals (blockers/warnings)
-        blockers = [s for s in analysis.signals if s.detected]
-        if blockers:
-            lines.append(f"⚠️ Signals: {', '.join(s.name for s in blockers)}")
-        
-        if analysis.suggested_reviewers:
-            lines.append(f"👀 Reviewers: {', '.join(analysis.suggested_reviewers[:3])}")
-        lines.append("")
+        lines.extend(format_pr_section(i, pr_metadata, analysis))
     
     lines.append(f"{'─' * 40}")
     lines.append("⏰ I'll nudge you in 2 days if any of these are still open!")
@@ -163,6 +451,26 @@ def format_consolidated_summary(analyses: list) -> str:
     return "\n".join(lines)
 
 
+def format_pr_section(i: int, pr_metadata, analysis) -> list:
+    """Lines for the i-th PR of a multi-PR summary."""
+    lines = [
+        f"{'─' * 40}",
+        f"*#{i} — <{pr_metadata.url}|{pr_metadata.title}>*",
+        f"👤 Author: `{pr_metadata.author}` | 📊 +{pr_metadata.lines_added}/-{pr_metadata.lines_removed}",
+        f"📝 {analysis.summary}",
+    ]
+    
+    # Show detected signals (blockers/warnings)
+    blockers = [s for s in analysis.signals if s.detected]
+    if blockers:
+        lines.append(f"⚠️ Signals: {', '.join(s.name for s in blockers)}")
+    
+    if analysis.suggested_reviewers:
+        lines.append(f"👀 Reviewers: {', '.join(analysis.suggested_reviewers[:3])}")
+    lines.append("")
+    return lines
+
+
 def format_single_pr(pr_metadata, analysis) -> str:
     """Format a single PR analysis."""
     lines = [
@@ -199,9 +507,10 @@ async def analyze_pull_request(pr: PRMetadata):
         reviewers = []
         if "/" in pr.repo_name:
             owner, repo = pr.repo_name.split("/", 1)
-            reviewers = await get_potential_reviewers(owner, repo, exclude_user=pr.author)
+            code_owners = await get_code_owners(owner, repo, pr.changed_filenames)
+            reviewers = await get_potential_reviewers(owner, repo, exclude_user=pr.author, code_owners=code_owners)
 
-        analysis = get_pr_analysis(pr, suggested_reviewers=reviewers)
+        analysis = await get_pr_analysis(pr, suggested_reviewers=reviewers)
         
         # Optionally send to slack if SLACK_WEBHOOK_URL is set
         if os.getenv("SLACK_WEBHOOK_URL"):
@@ -213,15 +522,21 @@ async def analyze_pull_request(pr: PRMetadata):
 
 @app.post("/analyze/github/{owner}/{repo}/{pr_number}", response_model=PRAnalysisOutput)
 async def analyze_github_pull_request(owner: str, repo: str, pr_number: int):
-    pr_metadata = await get_github_pr(owner, repo, pr_number)
+    try:
+        pr_metadata = (await get_github_prs([(owner, repo, pr_number)])).get((owner, repo, pr_number))
+    except GitHubRateLimited as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(round(e.retry_after))})
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"GitHub API error: {e}")
     if not pr_metadata:
-        raise HTTPException(status_code=404, detail="PR not found or GitHub API error")
+        raise HTTPException(status_code=404, detail="PR not found")
     
     # Fetch real potential reviewers
-    reviewers = await get_potential_reviewers(owner, repo, exclude_user=pr_metadata.author)
+    code_owners = await get_code_owners(owner, repo, pr_metadata.changed_filenames)
+    reviewers = await get_potential_reviewers(owner, repo, exclude_user=pr_metadata.author, code_owners=code_owners)
     
     try:
-        analysis = get_pr_analysis(pr_metadata, suggested_reviewers=reviewers)
+        analysis = await get_pr_analysis(pr_metadata, suggested_reviewers=reviewers)
         
         if os.getenv("SLACK_WEBHOOK_URL"):
             send_slack_message(analysis)
@@ -230,6 +545,102 @@ async def analyze_github_pull_request(owner: str, repo: str, pr_number: int):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# PRs analyzed in parallel for one /analyze/batch request, and the largest batch accepted
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 8))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 10000))
+
+# A batch item is either a reference to fetch from GitHub or full PR metadata
+BATCH_ITEM = TypeAdapter(Union[PRReference, PRMetadata])
+
+def batch_pr_loader(references: List[tuple]) -> Callable[[tuple], Awaitable[Optional[PRMetadata]]]:
+    """
+    Look up the PRs referenced by a batch request, fetching them through
+    get_github_prs GRAPHQL_BATCH_SIZE at a time. A chunk is fetched when
+    its first PR is asked for, so early items don't wait for the whole batch.
+    """
+    references = list(dict.fromkeys(references))
+    chunks = [references[i:i + GRAPHQL_BATCH_SIZE] for i in range(0, len(references), GRAPHQL_BATCH_SIZE)]
+    chunk_of = {key: n for n, chunk in enumerate(chunks) for key in chunk}
+    fetches = {}
+
+    async def load(key: tuple) -> Optional[PRMetadata]:
+        n = chunk_of[key]
+        if n not in fetches:
+            fetches[n] = asyncio.ensure_future(get_github_prs(chunks[n]))
+        # Shared by the chunk's items, so one of them being cancelled mustn't cancel the fetch
+        return (await asyncio.shield(fetches[n])).get(key)
+
+    return load
+
+async def analyze_batch_item(item: dict, load_pr: Callable[[tuple], Awaitable[Optional[PRMetadata]]]) -> PRAnalysisOutput:
+    with IN_FLIGHT.track(task="batch_item"), stage("batch.item"):
+        return await _analyze_batch_item(BATCH_ITEM.validate_python(item), load_pr)
+
+async def _analyze_batch_item(item: Union[PRReference, PRMetadata], load_pr: Callable[[tuple], Awaitable[Optional[PRMetadata]]]) -> PRAnalysisOutput:
+    if isinstance(item, PRReference):
+        pr = await load_pr((item.owner, item.repo, item.pr_number))
+        if not pr:
+            raise LookupError("PR not found")
+    else:
+        pr = item
+
+    reviewers = []
+    if "/" in pr.repo_name:
+        owner, repo = pr.repo_name.split("/", 1)
+        code_owners = await get_code_owners(owner, repo, pr.changed_filenames)
+        reviewers = await get_potential_reviewers(owner, repo, exclude_user=pr.author, code_owners=code_owners)
+    return await get_pr_analysis(pr, suggested_reviewers=reviewers)
+
+def batch_item_name(item: dict) -> tuple:
+    """(repo_name, pr_number) of a raw batch item for its result line, as far as it has them."""
+    repo_name = item.get("repo_name")
+    if "owner" in item and "repo" in item:
+        repo_name = f"{item['owner']}/{item['repo']}"
+    pr_number = item.get("pr_number")
+    return (
+        repo_name if isinstance(repo_name, str) else None,
+        pr_number if isinstance(pr_number, int) and not isinstance(pr_number, bool) else None,
+    )
+
+async def stream_batch_analysis(items: List[dict]):
+    """Yield one NDJSON line per item as its analysis finishes."""
+    references = []
+    for item in items:
+        try:
+            parsed = BATCH_ITEM.validate_python(item)
+        except ValidationError:
+            # Reported on the item's own line by analyze_batch_item
+            continue
+        if isinstance(parsed, PRReference):
+            references.append((parsed.owner, parsed.repo, parsed.pr_number))
+    load_pr = batch_pr_loader(references)
+
+    worker = lambda item: analyze_batch_item(item, load_pr)
+    async for index, analysis, error in bounded_as_completed(items, worker, BATCH_CONCURRENCY):
+        repo_name, pr_number = batch_item_name(items[index])
+        result = BatchAnalysisResult(
+            index=index,
+            repo_name=repo_name,
+            pr_number=pr_number,
+            analysis=analysis,
+            error=f"{type(error).__name__}: {error}" if error is not None else None,
+        )
+        if error is not None:
+            print(f"Batch analysis failed for {result.repo_name}#{result.pr_number}: {error}")
+        yield result.model_dump_json() + "\n"
+
+@app.post("/analyze/batch")
+async def analyze_batch(items: List[dict]):
+    """
+    Analyze many PRs in one request. Each item is either full PR metadata or
+    an {owner, repo, pr_number} reference to fetch from GitHub. Results are
+    streamed as newline-delimited BatchAnalysisResult objects in completion
+    order; an invalid or failed item gets an `error` line instead of failing the batch.
+    """
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} items per batch")
+    return StreamingResponse(stream_batch_analysis(items), media_type="application/x-ndjson")
+
 if __name__ == "__main__":
     import uvicorn
     # Default to 7860 for Hugging Face compatibility
@@ -0,0 +1,187 @@
+"""
+In-process metrics with Prometheus text exposition, and lightweight
+tracing spans.
+
+Everything lives in plain dicts keyed by label values, so recording a
+sample is a dict lookup plus an add, cheap enough to leave on in
+production. `stage()` is the main entry point: it times a block, records
+it in the per-stage histogram under the outcome the block reports, and
+links it to the surrounding span so one Slack event can be followed
+through every stage (set TRACE_LOG=true to print finished spans).
+"""
+import asyncio
+import bisect
+import contextvars
+import os
+import random
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry: List["_Metric"] = []
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape("" if v is None else v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        # Label values are rendered with str() at scrape time, not on this hot path
+        return tuple(map(labels.get, self.labelnames))
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help, labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for key, value in self.values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        self.values[self._key(labels)] = value
+
+    @contextmanager
+    def track(self, **labels) -> Iterator[None]:
+        """Count the block as in flight while it runs."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (last one is +Inf), sum]
+        self.values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        entry = self.values.get(key)
+        if entry is None:
+            entry = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for key, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="%s"' % ("+Inf" if bound == float("inf") else repr(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+def render_metrics() -> str:
+    """All registered metrics in the Prometheus text format (version 0.0.4)."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# Shared metrics, recorded from the services
+
+STAGE_SECONDS = Histogram(
+    "prwhisperer_stage_seconds",
+    "Time spent per processing stage, by outcome.",
+    ("stage", "outcome"),
+)
+CACHE_REQUESTS = Counter(
+    "prwhisperer_cache_requests_total",
+    "Cache lookups by cache and outcome (hit, stale, miss).",
+    ("cache", "outcome"),
+)
+IN_FLIGHT = Gauge(
+    "prwhisperer_in_flight",
+    "Background tasks currently running, by kind.",
+    ("task",),
+)
+
+# Tracing
+
+TRACE_LOG = os.getenv("TRACE_LOG", "false").lower() == "true"
+
+class Span:
+    """A timed stage. Use through `stage()`; the block sets `outcome` to label how it went."""
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "outcome", "attrs", "start", "duration", "_token")
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, trace_id: Optional[str] = None, attrs: dict = None):
+        self.name = name
+        self.trace_id = trace_id or (parent.trace_id if parent else "%016x" % random.getrandbits(64))
+        self.span_id = "%08x" % random.getrandbits(32)
+        self.parent_id = parent.span_id if parent else None
+        # e.g. "hit", "fallback", "429"; an exception leaving the block records "error"
+        self.outcome = "ok"
+        self.attrs = attrs
+        self.duration = 0.0
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        _current_span.reset(self._token)
+        if exc_type is not None and self.outcome == "ok":
+            self.outcome = "cancelled" if issubclass(exc_type, (asyncio.CancelledError, GeneratorExit)) else "error"
+        STAGE_SECONDS.observe(self.duration, stage=self.name, outcome=self.outcome)
+        if TRACE_LOG:
+            attrs = " ".join(f"{k}={v}" for k, v in (self.attrs or {}).items())
+            print(
+                f"trace={self.trace_id} span={self.span_id} parent={self.parent_id or '-'} "
+                f"stage={self.name} outcome={self.outcome} ms={self.duration * 1000:.1f} {attrs}".rstrip()
+            )
+        return False
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+def stage(name: str, parent: Optional[Span] = None, trace_id: Optional[str] = None, **attrs) -> Span:
+    """
+    Time a `with` block as a child of the current span (or `parent`, for
+    work handed to another task). `trace_id` starts a new trace, e.g. keyed
+    by the Slack event id.
+    """
+    return Span(name, parent=parent or (None if trace_id else _current_span.get()), trace_id=trace_id, attrs=attrs)
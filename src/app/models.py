@@ -16,6 +16,7 @@ class PRMetadata(BaseModel):
     pr_number: int
     url: str
     changed_filenames: List[str] = [] # Added to track specific files
+    head_sha: Optional[str] = None # Latest commit; changes on every push, force-pushes included
 
 class Signal(BaseModel):
     name: str
@@ -29,3 +30,24 @@ class PRAnalysisOutput(BaseModel):
     suggested_reviewers: List[str]
     improvement_hints: List[str]
 
+class PRAnalysisItem(PRAnalysisOutput):
+    # Position of the PR in a batched prompt
+    index: int
+
+class MultiPRAnalysisOutput(BaseModel):
+    """Structured result of one LLM call covering several PRs."""
+    analyses: List[PRAnalysisItem]
+
+
+class PRReference(BaseModel):
+    owner: str
+    repo: str
+    pr_number: int
+
+class BatchAnalysisResult(BaseModel):
+    # Results stream in completion order; `index` is the item's position in the request
+    index: int
+    repo_name: Optional[str] = None
+    pr_number: Optional[int] = None
+    analysis: Optional[PRAnalysisOutput] = None
+    error: Optional[str] = None
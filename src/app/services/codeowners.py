@@ -0,0 +1,196 @@
+import base64
+import os
+import re
+from collections import Counter
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from src.app.cache import StaleWhileRevalidateCache
+from src.app.services.github import github_get
+
+# Where GitHub looks for the file, in order
+CODEOWNERS_PATHS = (".github/CODEOWNERS", "CODEOWNERS", "docs/CODEOWNERS")
+
+# Bound on the per-index directory memo, which lives as long as the cached index
+MAX_MEMOIZED_DIRS = 50000
+
+def parse_codeowners(text: str) -> List[Tuple[str, List[str]]]:
+    """Return (pattern, owners) rules in file order. Later rules take precedence."""
+    rules = []
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        pattern, *owners = line.split()
+        rules.append((pattern, owners))
+    return rules
+
+def pattern_segments(pattern: str) -> List[str]:
+    """
+    Turn a CODEOWNERS pattern into path segments, where "**" matches any
+    number of directories. Follows GitHub's rules: a leading or inner slash
+    anchors the pattern to the repo root, a trailing slash matches only a
+    directory's contents, and a pattern ending in a plain name also owns
+    everything below it (`docs/*` however only matches direct children).
+    """
+    anchored = "/" in pattern.rstrip("/")
+    dir_only = pattern.endswith("/")
+    segments = [s for s in pattern.strip("/").split("/") if s]
+    if not anchored:
+        segments = ["**"] + segments
+    if dir_only:
+        segments += ["*", "**"]
+    elif not _is_wildcard(segments[-1]):
+        segments.append("**")
+
+    # a/**/**/b is the same as a/**/b
+    collapsed = []
+    for s in segments:
+        if not (s == "**" and collapsed and collapsed[-1] == "**"):
+            collapsed.append(s)
+    return collapsed
+
+def _is_wildcard(segment: str) -> bool:
+    return "*" in segment or "?" in segment
+
+def _segment_regex(segment: str) -> "re.Pattern":
+    body = "".join("[^/]*" if c == "*" else "[^/]" if c == "?" else re.escape(c) for c in segment)
+    return re.compile(body + r"\Z")
+
+class _Node:
+    __slots__ = ("literals", "wildcards", "globstar", "loop", "rule")
+
+    def __init__(self, loop: bool = False):
+        self.literals: Dict[str, "_Node"] = {}
+        self.wildcards: Dict[str, Tuple["re.Pattern", "_Node"]] = {}
+        self.globstar: Optional["_Node"] = None
+        # A "**" node stays active while it consumes any number of segments
+        self.loop = loop
+        # Index of the last rule ending at this node, -1 if none
+        self.rule = -1
+
+class OwnershipIndex:
+    """
+    CODEOWNERS rules compiled into a path trie.
+
+    Matching walks each path's segments once through the trie (an NFA over
+    literal, wildcard and "**" edges) instead of testing every rule, and
+    directory states are memoized so the files of one directory share the
+    work. As in GitHub, the last matching rule wins.
+    """
+
+    def __init__(self, rules: List[Tuple[str, List[str]]], sha: Optional[str] = None):
+        self.rules = rules
+        self.sha = sha
+        self._root = _Node()
+        for index, (pattern, _) in enumerate(rules):
+            self._insert(pattern_segments(pattern), index)
+        self._dir_states: Dict[str, FrozenSet[_Node]] = {"": self._closure({self._root})}
+
+    @classmethod
+    def from_text(cls, text: str, sha: Optional[str] = None) -> "OwnershipIndex":
+        return cls(parse_codeowners(text), sha=sha)
+
+    def _insert(self, segments: List[str], rule: int):
+        node = self._root
+        for segment in segments:
+            if segment == "**":
+                if node.globstar is None:
+                    node.globstar = _Node(loop=True)
+                node = node.globstar
+            elif _is_wildcard(segment):
+                if segment not in node.wildcards:
+                    node.wildcards[segment] = (_segment_regex(segment), _Node())
+                node = node.wildcards[segment][1]
+            else:
+                node = node.literals.setdefault(segment, _Node())
+        node.rule = max(node.rule, rule)
+
+    @staticmethod
+    def _closure(nodes) -> FrozenSet[_Node]:
+        # Entering a node also enters its "**" child, which may match zero segments
+        result = set()
+        stack = list(nodes)
+        while stack:
+            node = stack.pop()
+            if node not in result:
+                result.add(node)
+                if node.globstar is not None:
+                    stack.append(node.globstar)
+        return frozenset(result)
+
+    def _step(self, states: FrozenSet[_Node], segment: str) -> FrozenSet[_Node]:
+        following = []
+        for node in states:
+            if node.loop:
+                following.append(node)
+            child = node.literals.get(segment)
+            if child is not None:
+                following.append(child)
+            for regex, child in node.wildcards.values():
+                if regex.match(segment):
+                    following.append(child)
+        return self._closure(following)
+
+    def _states_for_dir(self, directory: str) -> FrozenSet[_Node]:
+        states = self._dir_states.get(directory)
+        if states is None:
+            parent, _, name = directory.rpartition("/")
+            states = self._step(self._states_for_dir(parent), name)
+            if len(self._dir_states) >= MAX_MEMOIZED_DIRS:
+                self._dir_states = {"": self._dir_states[""]}
+            self._dir_states[directory] = states
+        return states
+
+    def match_rule(self, path: str) -> int:
+        """Index of the rule that owns `path`, or -1."""
+        directory, _, name = path.strip("/").rpartition("/")
+        states = self._step(self._states_for_dir(directory), name)
+        return max((node.rule for node in states), default=-1)
+
+    def owners_for(self, path: str) -> List[str]:
+        rule = self.match_rule(path)
+        return self.rules[rule][1] if rule >= 0 else []
+
+    def rank_owners(self, paths: List[str]) -> List[str]:
+        """Individual owners (no teams or emails) of `paths`, most files owned first."""
+        counts = Counter()
+        for path in paths:
+            for owner in self.owners_for(path):
+                if owner.startswith("@") and "/" not in owner:
+                    counts[owner[1:]] += 1
+        return [owner for owner, _ in counts.most_common()]
+
+async def fetch_ownership_index(repo_key: Tuple[str, str]) -> Optional[OwnershipIndex]:
+    owner, repo = repo_key
+    for path in CODEOWNERS_PATHS:
+        response = await github_get(f"/repos/{owner}/{repo}/contents/{path}", essential=False)
+        if response.status_code == 404:
+            continue
+        if response.status_code != 200:
+            return None
+
+        data = response.json()
+        # Unchanged file (often just a 304 from the ETag cache): keep the compiled index
+        previous = ownership_cache.entries.get(repo_key)
+        if previous and previous[0].sha == data["sha"]:
+            return previous[0]
+        text = base64.b64decode(data["content"]).decode("utf-8", errors="replace")
+        return OwnershipIndex.from_text(text, sha=data["sha"])
+
+    # No CODEOWNERS file; cache an empty index so we don't keep asking
+    return OwnershipIndex([])
+
+# Re-checked (cheaply, via conditional requests) after the soft TTL, so edits to CODEOWNERS are picked up
+ownership_cache = StaleWhileRevalidateCache(
+    fetch_ownership_index,
+    maxsize=int(os.getenv("CODEOWNERS_CACHE_MAX_REPOS", 1000)),
+    soft_ttl=float(os.getenv("CODEOWNERS_CACHE_SOFT_TTL_SECONDS", 600)),
+    hard_ttl=float(os.getenv("CODEOWNERS_CACHE_HARD_TTL_SECONDS", 86400)),
+    name="codeowners",
+)
+
+async def get_ownership_index(repo_owner: str, repo_name: str) -> Optional[OwnershipIndex]:
+    return await ownership_cache.get((repo_owner, repo_name))
+
+async def get_code_owners(repo_owner: str, repo_name: str, changed_filenames: List[str]) -> List[str]:
+    index = await get_ownership_index(repo_owner, repo_name)
+    return index.rank_owners(changed_filenames) if index else []
@@ -0,0 +1,88 @@
+import datetime
+import os
+import time
+from typing import List, Optional
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from src.app.cache import LRUCache
+from src.app.database import AsyncSessionLocal, ProcessedSlackEvent, utcnow
+
+def event_keys(event_id: Optional[str], channel: Optional[str], ts: Optional[str]) -> List[str]:
+    """Dedup keys for one Slack event: its event_id, plus channel+ts so the same message seen twice also matches."""
+    keys = []
+    if event_id:
+        keys.append(f"event:{event_id}")
+    if channel and ts:
+        keys.append(f"msg:{channel}:{ts}")
+    return keys
+
+class MemoryEventStore:
+    """Per-process TTL store of seen event keys."""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 3600):
+        self.seen = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.duplicates = 0
+
+    async def claim(self, keys: List[str]) -> bool:
+        """Record `keys` as seen. Returns False if any of them was already seen."""
+        if any(k in self.seen for k in keys):
+            self.duplicates += 1
+            return False
+        for k in keys:
+            self.seen.set(k, True)
+        return True
+
+class DatabaseEventStore(MemoryEventStore):
+    """
+    Claims keys with an INSERT on the processed_slack_events table, so dedup
+    also holds across several uvicorn workers. The in-memory tier in front
+    answers local retries without a DB round trip.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 3600, prune_interval: float = 600):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.ttl = ttl
+        self.prune_interval = prune_interval
+        self._last_prune = 0.0
+
+    async def claim(self, keys: List[str]) -> bool:
+        if not await super().claim(keys):
+            return False
+        if await self._claim_in_db(keys):
+            return True
+        self.duplicates += 1
+        return False
+
+    async def _claim_in_db(self, keys: List[str]) -> bool:
+        cutoff = utcnow() - datetime.timedelta(seconds=self.ttl)
+        async with AsyncSessionLocal() as db:
+            try:
+                if time.monotonic() - self._last_prune > self.prune_interval:
+                    self._last_prune = time.monotonic()
+                    await db.execute(delete(ProcessedSlackEvent).where(ProcessedSlackEvent.created_at < cutoff))
+                else:
+                    # Expired rows for these keys must not block a genuinely new event
+                    await db.execute(delete(ProcessedSlackEvent).where(
+                        ProcessedSlackEvent.key.in_(keys),
+                        ProcessedSlackEvent.created_at < cutoff,
+                    ))
+                db.add_all([ProcessedSlackEvent(key=k) for k in keys])
+                await db.commit()
+                return True
+            except IntegrityError:
+                await db.rollback()
+                return False
+            except Exception as e:
+                # Never drop an event because the dedup table is unavailable
+                print(f"Slack dedup store failed, processing event anyway: {e}")
+                await db.rollback()
+                return True
+
+def _build_store() -> MemoryEventStore:
+    maxsize = int(os.getenv("SLACK_DEDUP_MAX_ENTRIES", 10000))
+    ttl = float(os.getenv("SLACK_DEDUP_TTL_SECONDS", 3600))
+    if os.getenv("SLACK_DEDUP_BACKEND", "memory").lower() == "database":
+        return DatabaseEventStore(maxsize=maxsize, ttl=ttl)
+    return MemoryEventStore(maxsize=maxsize, ttl=ttl)
+
+event_store = _build_store()
@@ -1,74 +1,422 @@
+import asyncio
 import httpx
 import os
+from contextlib import aclosing
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Any, AsyncIterator, Dict, Tuple
+from src.app.cache import StaleWhileRevalidateCache
+from src.app.database import utcnow
+from src.app.metrics import CACHE_REQUESTS, stage
 from src.app.models import PRMetadata
+from src.app.services.signals import is_test_file, is_doc_file
+from src.app.services.github_cache import response_cache, CachedResponse
+from src.app.services.pr_state import load_pr_states, remember_changed_files
+from src.app.services.github_ratelimit import GitHubRateLimited, governor, is_rate_limited, request_resource
 
-async def get_github_pr(repo_owner: str, repo_name: str, pr_number: int) -> Optional[PRMetadata]:
-    token = os.getenv("GITHUB_TOKEN")
+# One pooled client is shared by every GitHub call in the process so that
+# connections (and their TCP+TLS handshakes) are reused across requests.
+_client: Optional[httpx.AsyncClient] = None
+
+def _http2_enabled() -> bool:
+    if os.getenv("GITHUB_HTTP2", "true").lower() != "true":
+        return False
+    # httpx only speaks HTTP/2 when the optional `h2` package is installed
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def _build_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=int(os.getenv("GITHUB_MAX_CONNECTIONS", 20)),
+        max_keepalive_connections=int(os.getenv("GITHUB_MAX_KEEPALIVE_CONNECTIONS", 10)),
+        keepalive_expiry=float(os.getenv("GITHUB_KEEPALIVE_EXPIRY", 60)),
+    )
+    timeout = httpx.Timeout(
+        float(os.getenv("GITHUB_TIMEOUT", 10)),
+        connect=float(os.getenv("GITHUB_CONNECT_TIMEOUT", 5)),
+    )
+    return httpx.AsyncClient(
+        base_url=os.getenv("GITHUB_API_URL", "https://api.github.com"),
+        limits=limits,
+        timeout=timeout,
+        http2=_http2_enabled(),
+    )
+
+def get_github_client() -> httpx.AsyncClient:
+    """Return the shared GitHub client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+async def start_github_client():
+    get_github_client()
+
+async def close_github_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def _auth_headers(token: Optional[str]) -> dict:
     headers = {}
     if token:
         headers["Authorization"] = f"token {token}"
-    
-    url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/pulls/{pr_number}"
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, headers=headers)
-        if response.status_code != 200:
-            return None
-        
-        data = response.json()
-        
-        # Fetch changed files to check for tests/docs
-        files_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/pulls/{pr_number}/files"
-        files_response = await client.get(files_url, headers=headers)
-        changed_filenames = []
-        if files_response.status_code == 200:
-            changed_filenames = [f["filename"] for f in files_response.json()]
-        
-        return PRMetadata(
-            title=data["title"],
-            description=data.get("body"),
-            author=data["user"]["login"],
-            created_at=datetime.fromisoformat(data["created_at"].replace("Z", "+00:00")),
-            files_changed=data["changed_files"],
-            lines_added=data["additions"],
-            lines_removed=data["deletions"],
-            labels=[l["name"] for l in data.get("labels", [])],
-            review_status=data.get("state", "unknown"),
-            repo_name=f"{repo_owner}/{repo_name}",
-            pr_number=pr_number,
-            url=data["html_url"],
-            changed_filenames=changed_filenames
+    return headers
+
+async def github_request(method: str, path: str, params: dict = None, json: Any = None, timeout: float = None,
+                         headers: dict = None, essential: bool = True) -> httpx.Response:
+    """Send a request to the GitHub API through the shared client.
+
+    `path` is relative to GITHUB_API_URL; `timeout` overrides the client default for this call only.
+    The token is chosen by the rate-limit governor. Raises GitHubRateLimited when no token has quota
+    left; `essential=False` marks calls that should give up early and leave quota for PR fetches.
+    """
+    client = get_github_client()
+    resource = request_resource(path)
+    with stage("github.request", resource=resource) as span:
+        token = await governor.acquire(resource, essential=essential)
+        for attempt in range(2):
+            response = await client.request(
+                method,
+                path,
+                params=params,
+                json=json,
+                headers={**_auth_headers(token), **(headers or {})},
+                timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+            )
+            governor.update(token, resource, response)
+            if not is_rate_limited(response):
+                span.outcome = "304" if response.status_code == 304 else f"{response.status_code // 100}xx"
+                return response
+            if attempt == 0:
+                # This token is spent (or hit a secondary limit); one retry on the next best token
+                token = await governor.acquire(resource, essential=essential, exclude=token)
+        span.outcome = "rate_limited"
+        raise GitHubRateLimited(resource, governor.budget(token, resource).free_at())
+
+async def github_get(path: str, params: dict = None, timeout: float = None, essential: bool = True) -> httpx.Response:
+    """GET with conditional-request caching.
+
+    A cached ETag/Last-Modified is sent along, and a 304 (which GitHub doesn't
+    count against the rate limit) is answered with the cached body as a 200.
+    When the rate limit is exhausted the cached body is served as is.
+    """
+    key = str(get_github_client().build_request("GET", path, params=params).url)
+    cached = await response_cache.get(key)
+
+    try:
+        response = await github_request(
+            "GET", path, params=params, timeout=timeout,
+            headers=cached.validators() if cached else None,
+            essential=essential,
         )
+    except GitHubRateLimited:
+        if cached is None:
+            raise
+        response_cache.stale_hits += 1
+        CACHE_REQUESTS.inc(cache="github_etag", outcome="stale")
+        return cached.to_response(get_github_client().build_request("GET", path, params=params))
 
-async def get_potential_reviewers(repo_owner: str, repo_name: str, exclude_user: str) -> List[str]:
-    token = os.getenv("GITHUB_TOKEN")
-    headers = {}
-    if token:
-        headers["Authorization"] = f"token {token}"
-    
-    # Fetch contributors as a proxy for potential reviewers
-    url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/contributors?per_page=10"
-    
-    async with httpx.AsyncClient() as client:
+    if response.status_code == 304 and cached:
+        response_cache.hits += 1
+        CACHE_REQUESTS.inc(cache="github_etag", outcome="hit")
+        return cached.to_response(response.request)
+
+    if response.status_code == 200:
+        response_cache.misses += 1
+        CACHE_REQUESTS.inc(cache="github_etag", outcome="miss")
+        if "etag" in response.headers or "last-modified" in response.headers:
+            await response_cache.set(key, CachedResponse.from_response(response))
+    return response
+
+# How many changed filenames are kept on PRMetadata for large PRs
+PR_FILES_LIMIT = int(os.getenv("GITHUB_PR_FILES_LIMIT", 1000))
+
+async def iter_pr_filenames(repo_owner: str, repo_name: str, pr_number: int, max_files: int = None) -> AsyncIterator[str]:
+    """Yield a PR's changed filenames page by page, following the `Link: rel="next"` header."""
+    path = f"/repos/{repo_owner}/{repo_name}/pulls/{pr_number}/files"
+    params = {"per_page": 100}
+    seen = 0
+    while path:
+        response = await github_get(path, params=params)
+        if response.status_code == 404:
+            return
+        # A partial file list would get the signals wrong, so other errors propagate
+        response.raise_for_status()
+        for f in response.json():
+            yield f["filename"]
+            seen += 1
+            if max_files is not None and seen >= max_files:
+                return
+        # The next link is absolute and already carries per_page/page
+        path = response.links.get("next", {}).get("url")
+        params = None
+
+async def collect_pr_filenames(repo_owner: str, repo_name: str, pr_number: int, limit: int = None) -> List[str]:
+    """
+    Collect up to `limit` changed filenames.
+
+    Past the limit, paging only continues until a test file and a doc file
+    have been seen, and those are appended so detect_signals still gets
+    "No Tests"/"Docs Missing" right without materializing the whole PR.
+    """
+    limit = PR_FILES_LIMIT if limit is None else limit
+    filenames = []
+    has_tests = has_docs = False
+    async with aclosing(iter_pr_filenames(repo_owner, repo_name, pr_number)) as pager:
+        async for filename in pager:
+            new_test = not has_tests and is_test_file(filename)
+            new_doc = not has_docs and is_doc_file(filename)
+            if len(filenames) < limit or new_test or new_doc:
+                filenames.append(filename)
+            has_tests = has_tests or new_test
+            has_docs = has_docs or new_doc
+            if len(filenames) >= limit and has_tests and has_docs:
+                break
+    return filenames
+
+async def get_github_pr(repo_owner: str, repo_name: str, pr_number: int) -> Optional[PRMetadata]:
+    """The PR, or None if it doesn't exist. Transport errors and other error statuses raise."""
+    response = await github_get(f"/repos/{repo_owner}/{repo_name}/pulls/{pr_number}")
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+
+    data = response.json()
+
+    # Fetch changed files to check for tests/docs
+    changed_filenames = await collect_pr_filenames(repo_owner, repo_name, pr_number)
+
+    return PRMetadata(
+        title=data["title"],
+        description=data.get("body"),
+        author=data["user"]["login"],
+        created_at=datetime.fromisoformat(data["created_at"].replace("Z", "+00:00")),
+        files_changed=data["changed_files"],
+        lines_added=data["additions"],
+        lines_removed=data["deletions"],
+        labels=[l["name"] for l in data.get("labels", [])],
+        review_status=data.get("state", "unknown"),
+        repo_name=f"{repo_owner}/{repo_name}",
+        pr_number=pr_number,
+        url=data["html_url"],
+        changed_filenames=changed_filenames,
+        head_sha=(data.get("head") or {}).get("sha"),
+    )
+
+# GraphQL endpoint; set an absolute URL for GitHub Enterprise (https://HOST/api/graphql)
+GRAPHQL_URL = os.getenv("GITHUB_GRAPHQL_URL", "/graphql")
+# PRs per aliased query. Each PR asks for up to 100 files and 20 labels, so a
+# query stays far below GitHub's 500,000 node limit and costs a single point.
+GRAPHQL_BATCH_SIZE = int(os.getenv("GITHUB_GRAPHQL_BATCH_SIZE", 25))
+# `first` is capped at 100 by GitHub; bigger PRs page the rest over REST
+GRAPHQL_FILES_PER_PR = 100
+
+_PR_FIELDS = """
+fragment PRFields on PullRequest {
+  title
+  body
+  author { login }
+  createdAt
+  changedFiles
+  additions
+  deletions
+  state
+  url
+  headRefOid
+  labels(first: 20) { nodes { name } }
+  %s
+}
+"""
+_FILES_FIELD = "files(first: %d) { pageInfo { hasNextPage } nodes { path } }" % GRAPHQL_FILES_PER_PR
+
+def build_pr_query(prs: List[Tuple[str, str, int]], include_files: bool = True) -> Tuple[str, dict]:
+    """One query with an aliased `repository.pullRequest` lookup per PR. Returns (query, variables)."""
+    params, lookups, variables = [], [], {}
+    for i, (owner, repo, number) in enumerate(prs):
+        params.append(f"$o{i}: String!, $r{i}: String!, $n{i}: Int!")
+        lookups.append(f"  pr{i}: repository(owner: $o{i}, name: $r{i}) {{ pullRequest(number: $n{i}) {{ ...PRFields }} }}")
+        variables.update({f"o{i}": owner, f"r{i}": repo, f"n{i}": number})
+    query = "query(%s) {\n%s\n}\n" % (", ".join(params), "\n".join(lookups))
+    return query + _PR_FIELDS % (_FILES_FIELD if include_files else ""), variables
+
+def _pr_from_graphql(node: dict, owner: str, repo: str, number: int) -> PRMetadata:
+    # GraphQL reports merged PRs as MERGED, where REST says "closed"
+    state = node["state"].lower()
+    files = node.get("files") or {}
+    return PRMetadata(
+        title=node["title"],
+        description=node.get("body"),
+        author=(node.get("author") or {}).get("login", "ghost"),
+        created_at=datetime.fromisoformat(node["createdAt"].replace("Z", "+00:00")),
+        files_changed=node["changedFiles"],
+        lines_added=node["additions"],
+        lines_removed=node["deletions"],
+        labels=[l["name"] for l in node["labels"]["nodes"]],
+        review_status="closed" if state == "merged" else state,
+        repo_name=f"{owner}/{repo}",
+        pr_number=number,
+        url=node["url"],
+        changed_filenames=[f["path"] for f in files.get("nodes", [])],
+        head_sha=node.get("headRefOid"),
+    )
+
+async def _fetch_pr_chunk(prs: List[Tuple[str, str, int]], include_files: bool) -> Optional[Dict[tuple, Optional[PRMetadata]]]:
+    """Fetch one chunk with a single GraphQL query, or None if the query as a whole failed."""
+    query, variables = build_pr_query(prs, include_files)
+    try:
+        response = await github_request("POST", GRAPHQL_URL, json={"query": query, "variables": variables})
+        payload = response.json() if response.status_code == 200 else {}
+    except Exception as e:
+        print(f"GitHub GraphQL request failed: {e}")
+        return None
+    data = payload.get("data")
+    if not data:
+        # Unauthenticated, rate limited or a malformed query: nothing usable came back
+        print(f"GitHub GraphQL query failed ({response.status_code}): {payload.get('errors')}")
+        return None
+
+    results, truncated = {}, []
+    for i, pr in enumerate(prs):
+        # A missing repo or PR comes back as null plus a NOT_FOUND entry in `errors`
+        node = (data.get(f"pr{i}") or {}).get("pullRequest")
+        results[pr] = _pr_from_graphql(node, *pr) if node else None
+        if node and include_files and node["files"]["pageInfo"]["hasNextPage"]:
+            truncated.append(pr)
+
+    # Rare huge PRs: REST paging applies the usual file limit and test/doc look-ahead
+    filenames = await asyncio.gather(*(collect_pr_filenames(*pr) for pr in truncated))
+    for pr, names in zip(truncated, filenames):
+        results[pr].changed_filenames = names
+    return results
+
+async def _get_prs_over_rest(prs: List[Tuple[str, str, int]], semaphore: asyncio.Semaphore) -> Dict[tuple, Optional[PRMetadata]]:
+    async def fetch(pr):
+        async with semaphore:
+            return await get_github_pr(*pr)
+
+    fetched = await asyncio.gather(*(fetch(pr) for pr in prs), return_exceptions=True)
+    errors = [result for result in fetched if isinstance(result, Exception)]
+    for pr, result in zip(prs, fetched):
+        if isinstance(result, Exception):
+            print(f"Error fetching {pr[0]}/{pr[1]}#{pr[2]}: {result}")
+    # One PR erroring leaves it unanswered; a used-up quota or GitHub failing
+    # every PR is raised, so the caller waits or retries instead
+    rate_limited = [e for e in errors if isinstance(e, GitHubRateLimited)]
+    if rate_limited:
+        raise rate_limited[0]
+    if errors and len(errors) == len(prs):
+        raise errors[0]
+    return {pr: None if isinstance(result, Exception) else result for pr, result in zip(prs, fetched)}
+
+async def get_github_prs(prs: List[Tuple[str, str, int]], include_files: bool = True, concurrency: int = 8) -> Dict[tuple, Optional[PRMetadata]]:
+    """
+    Fetch many PRs, across repos, in one GraphQL round trip per
+    GRAPHQL_BATCH_SIZE PRs. Maps each (owner, repo, pr_number) to its
+    PRMetadata, or None if it doesn't exist. With `include_files=False` the
+    changed files are skipped (e.g. when only `review_status` is needed).
+
+    Chunks whose query fails, or every chunk when no token is configured,
+    fall back to REST, `concurrency` PRs at a time.
+    A PR GitHub answers with an error there maps to None as well. If the
+    quota is used up (GitHubRateLimited) or every PR errors (httpx.HTTPError),
+    the error is raised rather than reporting the PRs as missing.
+    """
+    prs = list(dict.fromkeys(prs))
+    with stage("github.fetch_prs", prs=len(prs)) as span:
+        fetched_at = utcnow()
         try:
-            response = await client.get(url, headers=headers)
-            if response.status_code == 200:
-                contributors = response.json()
-                # Filter out:
-                # 1. The PR author
-                # 2. Bots (checked via type and login suffix)
-                # 3. Limit to 1 suggestion
-                potential = [
-                    c["login"] for c in contributors 
-                    if c["login"] != exclude_user 
-                    and c["type"] == "User" 
-                    and not c["login"].endswith("[bot]")
-                ]
-                return potential[:1]
+            # PRs tracked through webhooks need no GitHub call at all
+            results, missing_files = await load_pr_states(prs, include_files)
         except Exception as e:
-            print(f"Error fetching reviewers: {e}")
-    
-    return []
+            print(f"PR state store unavailable, fetching from GitHub: {e}")
+            results, missing_files = {}, set()
+        prs = [pr for pr in prs if pr not in results]
+        span.outcome = "store" if not prs else "graphql"
+
+        chunks = [prs[i:i + GRAPHQL_BATCH_SIZE] for i in range(0, len(prs), GRAPHQL_BATCH_SIZE)]
+        if any(governor.tokens):
+            fetched = await asyncio.gather(*(_fetch_pr_chunk(chunk, include_files) for chunk in chunks))
+        else:
+            # GraphQL answers 401 to every unauthenticated query, so go straight to REST
+            fetched = [None] * len(chunks)
+
+        fallback = []
+        for chunk, chunk_results in zip(chunks, fetched):
+            if chunk_results is None:
+                fallback.extend(chunk)
+            else:
+                results.update(chunk_results)
+        if fallback:
+            span.outcome = "rest_fallback"
+            results.update(await _get_prs_over_rest(fallback, asyncio.Semaphore(concurrency)))
+
+        # Keep the file lists of tracked PRs, so the next analysis is served locally
+        to_remember = {key: results[key] for key in missing_files if results.get(key)}
+        if include_files and to_remember:
+            try:
+                await remember_changed_files(to_remember, fetched_at)
+            except Exception as e:
+                print(f"Failed to store changed files: {e}")
+        return results
+
+async def invalidate_pr_cache(repo_owner: str, repo_name: str, pr_number: int):
+    """Drop the cached REST responses of a PR (e.g. after a push), so the next fetch is a full one."""
+    client = get_github_client()
+    path = f"/repos/{repo_owner}/{repo_name}/pulls/{pr_number}"
+    for path, params in ((path, None), (f"{path}/files", {"per_page": 100})):
+        await response_cache.invalidate(str(client.build_request("GET", path, params=params).url))
+
+async def fetch_reviewer_candidates(repo_owner: str, repo_name: str) -> Optional[List[str]]:
+    """Top human contributors of a repo, or None if GitHub couldn't be reached."""
+    try:
+        # Fetch contributors as a proxy for potential reviewers
+        response = await github_get(
+            f"/repos/{repo_owner}/{repo_name}/contributors",
+            params={"per_page": 10},
+            essential=False,
+        )
+        if response.status_code == 200:
+            # Filter out bots (checked via type and login suffix)
+            return [
+                c["login"] for c in response.json()
+                if c["type"] == "User"
+                and not c["login"].endswith("[bot]")
+            ]
+        if response.status_code == 404:
+            return []
+    except Exception as e:
+        print(f"Error fetching reviewers: {e}")
+
+    return None
+
+# Contributor lists barely change, so they're served from memory and refreshed in the background
+reviewer_cache = StaleWhileRevalidateCache(
+    lambda repo_key: fetch_reviewer_candidates(*repo_key),
+    maxsize=int(os.getenv("REVIEWER_CACHE_MAX_REPOS", 5000)),
+    soft_ttl=float(os.getenv("REVIEWER_CACHE_SOFT_TTL_SECONDS", 3600)),
+    hard_ttl=float(os.getenv("REVIEWER_CACHE_HARD_TTL_SECONDS", 86400)),
+    name="reviewers",
+)
+
+async def get_reviewer_candidates(repo_owner: str, repo_name: str) -> List[str]:
+    """Reviewer candidates for a repo, before excluding any PR author."""
+    return await reviewer_cache.get((repo_owner, repo_name)) or []
+
+async def warm_reviewer_cache(repos: List[str]):
+    """Preload reviewer candidates for "owner/repo" entries, e.g. from GITHUB_WARM_REPOS."""
+    keys = [tuple(r.strip().split("/", 1)) for r in repos if "/" in r]
+    await asyncio.gather(*(reviewer_cache.refresh(key) for key in keys))
+
+def pick_reviewers(candidates: List[str], exclude_user: str, code_owners: List[str] = None) -> List[str]:
+    # Prefer owners of the changed files, then top contributors.
+    # Never suggest the PR author, and limit to 1 suggestion
+    pool = list(dict.fromkeys((code_owners or []) + candidates))
+    return [c for c in pool if c != exclude_user][:1]
 
+async def get_potential_reviewers(repo_owner: str, repo_name: str, exclude_user: str, code_owners: List[str] = None) -> List[str]:
+    candidates = await get_reviewer_candidates(repo_owner, repo_name)
+    return pick_reviewers(candidates, exclude_user, code_owners=code_owners)
@@ -0,0 +1,122 @@
+import json
+import os
+from typing import Optional
+import httpx
+from sqlalchemy import delete
+from src.app.cache import LRUCache
+from src.app.database import AsyncSessionLocal, GitHubResponseCache, utcnow
+
+# Response headers worth replaying when a 304 is served from the cache
+_KEPT_HEADERS = ("content-type", "link", "etag", "last-modified")
+
+class CachedResponse:
+    def __init__(self, etag: Optional[str], last_modified: Optional[str], headers: dict, body: bytes):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.headers = headers
+        self.body = body
+
+    @classmethod
+    def from_response(cls, response: httpx.Response) -> "CachedResponse":
+        headers = {k: response.headers[k] for k in _KEPT_HEADERS if k in response.headers}
+        return cls(
+            etag=response.headers.get("etag"),
+            last_modified=response.headers.get("last-modified"),
+            headers=headers,
+            body=response.content,
+        )
+
+    def validators(self) -> dict:
+        """Conditional-request headers that let GitHub answer with a 304."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def to_response(self, request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers=self.headers, content=self.body, request=request)
+
+class ResponseCache:
+    """
+    ETag/Last-Modified cache for GitHub GET requests.
+
+    Entries live in a bounded in-memory LRU, optionally backed by the app
+    database so validators survive restarts and are shared between workers.
+    """
+
+    def __init__(self, maxsize: int = 1024, persist: bool = False):
+        self.memory = LRUCache(maxsize=maxsize)
+        self.persist = persist
+        self.hits = 0         # 304s answered from the cache
+        self.misses = 0       # full 200 responses
+        self.disk_reads = 0   # memory misses found in the database tier
+        self.stale_hits = 0   # served from the cache because the rate limit was exhausted
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self.memory.get(key)
+        if entry is None and self.persist:
+            entry = await self._load(key)
+            if entry is not None:
+                self.disk_reads += 1
+                self.memory.set(key, entry)
+        return entry
+
+    async def set(self, key: str, entry: CachedResponse):
+        self.memory.set(key, entry)
+        if self.persist:
+            await self._store(key, entry)
+
+    async def invalidate(self, key: str):
+        self.memory.pop(key)
+        if self.persist:
+            await self._delete(key)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_reads": self.disk_reads,
+            "stale_hits": self.stale_hits,
+            "entries": len(self.memory),
+        }
+
+    async def _load(self, key: str) -> Optional[CachedResponse]:
+        async with AsyncSessionLocal() as db:
+            try:
+                row = await db.get(GitHubResponseCache, key)
+            except Exception as e:
+                print(f"GitHub cache read failed: {e}")
+                return None
+            if row is None:
+                return None
+            return CachedResponse(row.etag, row.last_modified, json.loads(row.headers or "{}"), row.body)
+
+    async def _store(self, key: str, entry: CachedResponse):
+        async with AsyncSessionLocal() as db:
+            try:
+                await db.merge(GitHubResponseCache(
+                    key=key,
+                    etag=entry.etag,
+                    last_modified=entry.last_modified,
+                    headers=json.dumps(entry.headers),
+                    body=entry.body,
+                    updated_at=utcnow(),
+                ))
+                await db.commit()
+            except Exception as e:
+                print(f"GitHub cache write failed: {e}")
+
+    async def _delete(self, key: str):
+        async with AsyncSessionLocal() as db:
+            try:
+                await db.execute(delete(GitHubResponseCache).where(GitHubResponseCache.key == key))
+                await db.commit()
+            except Exception as e:
+                print(f"GitHub cache delete failed: {e}")
+
+response_cache = ResponseCache(
+    maxsize=int(os.getenv("GITHUB_CACHE_MAX_ENTRIES", 1024)),
+    persist=os.getenv("GITHUB_CACHE_PERSIST", "false").lower() == "true",
+)
@@ -0,0 +1,157 @@
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+import httpx
+
+class GitHubRateLimited(Exception):
+    """No token has quota left for this request (and waiting for a reset would take too long)."""
+
+    def __init__(self, resource: str, reset_at: float):
+        self.resource = resource
+        self.reset_at = reset_at
+        super().__init__(f"GitHub {resource} rate limit exhausted, resets in {self.retry_after:.0f}s")
+
+    @property
+    def retry_after(self) -> float:
+        return max(0.0, self.reset_at - time.time())
+
+class Budget:
+    """Last known quota of one token for one resource ("core", "graphql", ...)."""
+    __slots__ = ("limit", "remaining", "reset_at", "blocked_until")
+
+    def __init__(self):
+        self.limit: Optional[int] = None
+        # None until GitHub has told us; treated as plenty
+        self.remaining: Optional[int] = None
+        self.reset_at = 0.0
+        # Set by secondary (abuse) limits, which come with Retry-After instead of a quota
+        self.blocked_until = 0.0
+
+    def available(self, now: float, floor: int) -> bool:
+        if self.blocked_until > now:
+            return False
+        if self.remaining is not None and self.reset_at <= now:
+            # The window rolled over since we last heard
+            self.remaining = None
+        return self.remaining is None or self.remaining > floor
+
+    def free_at(self) -> float:
+        return max(self.blocked_until, self.reset_at)
+
+def is_rate_limited(response: httpx.Response) -> bool:
+    return response.status_code in (403, 429) and (
+        response.headers.get("x-ratelimit-remaining") == "0" or "retry-after" in response.headers
+    )
+
+def request_resource(path: str) -> str:
+    return "graphql" if path.rstrip("/").endswith("graphql") else "core"
+
+class RateLimitGovernor:
+    """
+    Spreads GitHub calls over a pool of tokens using the quota GitHub reports
+    in the X-RateLimit-* headers of every response.
+
+    Each request goes to the token with the most quota left for its resource.
+    When every token is spent, essential requests wait for the earliest reset
+    (up to `max_wait` seconds) and otherwise raise GitHubRateLimited.
+    Non-essential requests (reviewer lookups, CODEOWNERS, warm-ups) stop as
+    soon as quota drops to `reserve`, which keeps the rest for fetching PRs;
+    their callers fall back to cached data.
+    """
+
+    def __init__(self, tokens: List[Optional[str]], reserve: int = 100, max_wait: float = 30):
+        # A None token means unauthenticated requests
+        self.tokens = tokens or [None]
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.budgets: Dict[Tuple[Optional[str], str], Budget] = {}
+        self.waits = 0
+        self.rejected = 0
+
+    def budget(self, token: Optional[str], resource: str) -> Budget:
+        key = (token, resource)
+        if key not in self.budgets:
+            self.budgets[key] = Budget()
+        return self.budgets[key]
+
+    def _pick(self, resource: str, floor: int, exclude: Optional[str] = None) -> Tuple[Optional[str], bool]:
+        now = time.time()
+        best, best_remaining = None, -1
+        for token in self.tokens:
+            if exclude is not None and token == exclude and len(self.tokens) > 1:
+                continue
+            budget = self.budget(token, resource)
+            if not budget.available(now, floor):
+                continue
+            remaining = budget.remaining if budget.remaining is not None else float("inf")
+            if remaining > best_remaining:
+                best, best_remaining = token, remaining
+        return best, best_remaining >= 0
+
+    def _earliest_reset(self, resource: str) -> float:
+        return min(self.budget(token, resource).free_at() for token in self.tokens)
+
+    async def acquire(self, resource: str = "core", essential: bool = True, exclude: Optional[str] = None) -> Optional[str]:
+        """Pick the token for the next request, waiting for a reset if allowed."""
+        floor = 0 if essential else self.reserve
+        while True:
+            token, found = self._pick(resource, floor, exclude)
+            if found:
+                budget = self.budget(token, resource)
+                if budget.remaining is not None:
+                    # Count the request now so concurrent callers spread over the pool
+                    budget.remaining -= 1
+                return token
+
+            reset_at = self._earliest_reset(resource)
+            wait = reset_at - time.time()
+            if not essential or wait > self.max_wait:
+                self.rejected += 1
+                raise GitHubRateLimited(resource, reset_at)
+            self.waits += 1
+            await asyncio.sleep(max(wait, 0.05))
+
+    def update(self, token: Optional[str], resource: str, response: httpx.Response):
+        """Record the quota reported by a response made with `token`."""
+        headers = response.headers
+        resource = headers.get("x-ratelimit-resource", resource)
+        budget = self.budget(token, resource)
+        try:
+            if "x-ratelimit-remaining" in headers:
+                budget.remaining = int(headers["x-ratelimit-remaining"])
+                budget.limit = int(headers.get("x-ratelimit-limit", budget.limit or 0)) or None
+                budget.reset_at = float(headers.get("x-ratelimit-reset", budget.reset_at))
+            if is_rate_limited(response) and "retry-after" in headers:
+                budget.blocked_until = time.time() + float(headers["retry-after"])
+        except ValueError:
+            pass
+
+    def stats(self) -> dict:
+        now = time.time()
+        budgets = []
+        for (token, resource), budget in self.budgets.items():
+            budgets.append({
+                # Never expose a token, only enough to tell them apart
+                "token": f"...{token[-4:]}" if token else "anonymous",
+                "resource": resource,
+                "limit": budget.limit,
+                "remaining": budget.remaining,
+                "resets_in": round(max(0.0, budget.reset_at - now)),
+                "blocked_for": round(max(0.0, budget.blocked_until - now)),
+            })
+        return {"tokens": len(self.tokens), "waits": self.waits, "rejected": self.rejected, "budgets": budgets}
+
+def configured_tokens() -> List[Optional[str]]:
+    """GITHUB_TOKENS (comma-separated PATs or installation tokens), plus GITHUB_TOKEN."""
+    tokens = [t.strip() for t in os.getenv("GITHUB_TOKENS", "").split(",") if t.strip()]
+    single = os.getenv("GITHUB_TOKEN")
+    if single and single not in tokens:
+        tokens.append(single)
+    return tokens or [None]
+
+governor = RateLimitGovernor(
+    configured_tokens(),
+    reserve=int(os.getenv("GITHUB_RATE_LIMIT_RESERVE", 100)),
+    max_wait=float(os.getenv("GITHUB_RATE_LIMIT_MAX_WAIT", 30)),
+)
@@ -0,0 +1,153 @@
+import datetime
+import hashlib
+import hmac
+import json
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy import delete, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from src.app.database import AsyncSessionLocal, PRReminder, PRState, utcnow
+from src.app.models import PRMetadata
+
+# pull_request actions that change something we keep
+TRACKED_ACTIONS = {
+    "opened", "reopened", "closed", "synchronize", "edited",
+    "labeled", "unlabeled", "ready_for_review", "converted_to_draft",
+}
+# After these the PR's diff may differ (new commits, or a new base branch)
+DIFF_CHANGING_ACTIONS = {"synchronize", "edited"}
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    """Check GitHub's X-Hub-Signature-256 header (HMAC-SHA256 of the raw body)."""
+    if not secret or not signature or not signature.startswith("sha256="):
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature[len("sha256="):])
+
+def _parse_time(value: str) -> datetime.datetime:
+    # Stored naive UTC, like the other tables (SQLite doesn't keep the timezone)
+    parsed = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+async def apply_pull_request_event(action: str, payload: dict) -> bool:
+    """
+    Upsert the PR's row from a `pull_request` webhook and cancel its pending
+    reminders once it is closed or merged. Returns False for a delivery older
+    than what is already stored (GitHub doesn't guarantee ordering).
+    """
+    pr = payload["pull_request"]
+    owner = payload["repository"]["owner"]["login"]
+    repo = payload["repository"]["name"]
+    key = (owner, repo, pr["number"])
+    github_updated_at = _parse_time(pr["updated_at"])
+
+    async with AsyncSessionLocal() as db:
+        row = await db.get(PRState, key)
+        if row is not None and row.github_updated_at and row.github_updated_at > github_updated_at:
+            return False
+        if row is None:
+            row = PRState(owner=owner, repo=repo, pr_number=pr["number"])
+            db.add(row)
+        elif action in DIFF_CHANGING_ACTIONS or row.head_sha != pr["head"]["sha"]:
+            # The cached file list is stale; the next fetch fills it again
+            row.changed_filenames = None
+
+        row.title = pr["title"]
+        row.description = pr.get("body")
+        row.author = (pr.get("user") or {}).get("login", "ghost")
+        row.state = pr["state"]
+        row.merged = bool(pr.get("merged"))
+        row.created_at = _parse_time(pr["created_at"])
+        # Webhook payloads carry the full PR object, sizes included
+        row.files_changed = pr.get("changed_files", row.files_changed or 0)
+        row.lines_added = pr.get("additions", row.lines_added or 0)
+        row.lines_removed = pr.get("deletions", row.lines_removed or 0)
+        row.labels = json.dumps([l["name"] for l in pr.get("labels", [])])
+        row.url = pr["html_url"]
+        row.head_sha = pr["head"]["sha"]
+        row.github_updated_at = github_updated_at
+        row.updated_at = utcnow()
+
+        if pr["state"] == "closed":
+            await db.execute(delete(PRReminder).where(
+                PRReminder.owner == owner,
+                PRReminder.repo == repo,
+                PRReminder.pr_number == pr["number"],
+                PRReminder.is_sent == False,
+            ))
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Another worker inserted the same PR first; its copy is as good as ours
+            await db.rollback()
+            return False
+    return True
+
+def _to_metadata(row: PRState) -> PRMetadata:
+    return PRMetadata(
+        title=row.title,
+        description=row.description,
+        author=row.author,
+        created_at=row.created_at.replace(tzinfo=datetime.timezone.utc),
+        files_changed=row.files_changed,
+        lines_added=row.lines_added,
+        lines_removed=row.lines_removed,
+        labels=json.loads(row.labels or "[]"),
+        review_status=row.state,
+        repo_name=f"{row.owner}/{row.repo}",
+        pr_number=row.pr_number,
+        url=row.url,
+        changed_filenames=json.loads(row.changed_filenames or "[]"),
+        head_sha=row.head_sha,
+    )
+
+async def load_pr_states(keys: List[Tuple[str, str, int]], include_files: bool = True) -> Tuple[Dict[tuple, PRMetadata], Set[tuple]]:
+    """
+    PRMetadata for the PRs whose state webhooks keep current, plus the keys
+    of tracked PRs whose file list isn't known yet. With `include_files`
+    those are left out of the metadata, as they still need a fetch.
+    """
+    if not keys:
+        return {}, set()
+    async with AsyncSessionLocal() as db:
+        rows = (await db.scalars(
+            select(PRState).where(tuple_(PRState.owner, PRState.repo, PRState.pr_number).in_(keys))
+        )).all()
+    known, missing_files = {}, set()
+    for row in rows:
+        key = (row.owner, row.repo, row.pr_number)
+        if row.changed_filenames is None:
+            missing_files.add(key)
+            if include_files:
+                continue
+        known[key] = _to_metadata(row)
+    return known, missing_files
+
+async def remember_changed_files(prs: Dict[tuple, PRMetadata], fetched_at: datetime.datetime):
+    """
+    Keep the file lists just fetched from GitHub for tracked PRs. A row that
+    a webhook touched after `fetched_at` is skipped, since the fetch may
+    predate that push.
+    """
+    async with AsyncSessionLocal() as db:
+        for (owner, repo, pr_number), pr in prs.items():
+            await db.execute(
+                update(PRState)
+                .where(
+                    PRState.owner == owner,
+                    PRState.repo == repo,
+                    PRState.pr_number == pr_number,
+                    PRState.changed_filenames.is_(None),
+                    PRState.updated_at <= fetched_at,
+                )
+                .values(changed_filenames=json.dumps(pr.changed_filenames))
+            )
+        await db.commit()
+
+async def prune_closed_pr_states(retention: datetime.timedelta) -> int:
+    """Forget PRs that have been closed for longer than `retention`."""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            delete(PRState).where(PRState.state == "closed", PRState.updated_at < utcnow() - retention)
+        )
+        await db.commit()
+        return result.rowcount
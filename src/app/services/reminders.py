@@ -0,0 +1,218 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.app.database import AsyncSessionLocal, PRReminder, utcnow
+from src.app.metrics import IN_FLIGHT, stage
+from src.app.models import PRMetadata
+from src.app.services.github import get_github_prs
+from src.app.services.github_ratelimit import GitHubRateLimited
+from src.app.services.pr_state import prune_closed_pr_states
+from src.app.services.slack import post_thread_reply
+
+REMINDER_DELAY = timedelta(days=2)
+
+async def schedule_reminders(db: AsyncSession, prs: List[tuple], channel: str, thread_ts: str, delay: timedelta = REMINDER_DELAY):
+    """
+    Upsert one reminder per (repo, PR, thread) for each (owner, repo, pr_number) in `prs`.
+    Pasting a PR into the same thread again pushes its reminder back instead of adding a row.
+    Existing rows are updated with one UPDATE and new ones added with one bulk INSERT.
+    """
+    reminder_time = utcnow() + delay
+    # dict.fromkeys drops repeats of the same PR within one message
+    prs = list(dict.fromkeys(prs))
+
+    rows = await db.execute(
+        select(PRReminder.id, PRReminder.owner, PRReminder.repo, PRReminder.pr_number).where(
+            PRReminder.channel == channel,
+            PRReminder.thread_ts == thread_ts,
+        )
+    )
+    existing = {(r.owner, r.repo, r.pr_number): r.id for r in rows}
+
+    existing_ids = [existing[pr] for pr in prs if pr in existing]
+    if existing_ids:
+        await db.execute(
+            update(PRReminder)
+            .where(PRReminder.id.in_(existing_ids))
+            .values(reminder_time=reminder_time, is_sent=False)
+        )
+
+    new_rows = [
+        {
+            "owner": owner,
+            "repo": repo,
+            "pr_number": pr_number,
+            "channel": channel,
+            "thread_ts": thread_ts,
+            "reminder_time": reminder_time,
+            "is_sent": False,
+        }
+        for owner, repo, pr_number in prs
+        if (owner, repo, pr_number) not in existing
+    ]
+    if new_rows:
+        await db.execute(insert(PRReminder), new_rows)
+
+async def prune_sent_reminders(retention: timedelta) -> int:
+    """Delete reminders that were sent more than `retention` ago."""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            delete(PRReminder).where(
+                PRReminder.is_sent == True,
+                PRReminder.reminder_time < utcnow() - retention,
+            )
+        )
+        await db.commit()
+        return result.rowcount
+
+class ReminderScheduler:
+    """
+    Sends the "still open?" nudges.
+
+    Instead of polling on a fixed interval it sleeps until the earliest
+    pending reminder is due (or until `notify()` reports a new one). Due
+    reminders are claimed in batches with a conditional UPDATE, so each one
+    is sent at most once even with several app instances running.
+    """
+
+    def __init__(self, batch_size: int = 100, concurrency: int = 8, max_sleep: float = 900,
+                 retention: timedelta = timedelta(days=30), prune_interval: float = 3600, retry_delay: float = 300):
+        self.batch_size = batch_size
+        # Only bounds the per-PR REST fallback; normally a batch is checked with one GraphQL query
+        self.concurrency = concurrency
+        # Upper bound on a sleep, so reminders added by other instances are still picked up
+        self.max_sleep = max_sleep
+        # Sent reminders (and the state of closed PRs) are kept this long, then pruned
+        self.retention = retention
+        self.prune_interval = prune_interval
+        # How long a batch waits after GitHub failed to answer for it
+        self.retry_delay = retry_delay
+        self._last_prune: Optional[datetime] = None
+        self._wakeup = asyncio.Event()
+
+    def notify(self):
+        """Wake the scheduler so it re-reads the next due time."""
+        self._wakeup.set()
+
+    async def run(self):
+        while True:
+            try:
+                claimed = await self.run_due()
+                if len(claimed) == self.batch_size:
+                    # Probably a backlog, go straight on to the next batch
+                    continue
+                await self._maybe_prune()
+                delay = await self._seconds_until_next_due()
+            except Exception as e:
+                print(f"Error in reminder loop: {e}")
+                delay = self.max_sleep
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=min(delay, self.max_sleep))
+            except asyncio.TimeoutError:
+                pass
+
+    async def run_due(self) -> List[tuple]:
+        """Claim one batch of due reminders, check their PRs in bulk and send the nudges."""
+        claimed = await self._claim_due_batch()
+        if not claimed:
+            return claimed
+        with IN_FLIGHT.track(task="reminders"), stage("reminders.batch", reminders=len(claimed)) as span:
+            try:
+                # Only the state and author are needed, so skip the changed files
+                prs = await get_github_prs(
+                    [(owner, repo, pr_number) for owner, repo, pr_number, _, _ in claimed],
+                    include_files=False,
+                    concurrency=self.concurrency,
+                )
+            except GitHubRateLimited as e:
+                # Put the batch back until the quota resets instead of dropping the nudges
+                print(f"Rate limited while checking reminders, retrying in {e.retry_after:.0f}s")
+                span.outcome = "rate_limited"
+                await self._release(claimed, utcnow() + timedelta(seconds=e.retry_after))
+                return []
+            except Exception as e:
+                # GitHub is down or erroring; try the batch again later rather than dropping the nudges
+                print(f"Error checking PRs for reminders, retrying in {self.retry_delay:.0f}s: {e}")
+                span.outcome = "error"
+                await self._release(claimed, utcnow() + timedelta(seconds=self.retry_delay))
+                return []
+            for reminder in claimed:
+                self._send_nudge(reminder, prs.get(reminder[:3]))
+        return claimed
+
+    async def _maybe_prune(self):
+        now = utcnow()
+        if self._last_prune and (now - self._last_prune).total_seconds() < self.prune_interval:
+            return
+        self._last_prune = now
+        pruned = await prune_sent_reminders(self.retention)
+        if pruned:
+            print(f"Pruned {pruned} sent reminders")
+        forgotten = await prune_closed_pr_states(self.retention)
+        if forgotten:
+            print(f"Pruned {forgotten} closed PR states")
+
+    async def _seconds_until_next_due(self) -> float:
+        async with AsyncSessionLocal() as db:
+            next_due: Optional[datetime] = await db.scalar(
+                select(func.min(PRReminder.reminder_time)).where(PRReminder.is_sent == False)
+            )
+        if next_due is None:
+            return self.max_sleep
+        return max(0.0, (next_due - utcnow()).total_seconds())
+
+    async def _claim_due_batch(self) -> List[tuple]:
+        async with AsyncSessionLocal() as db:
+            due_ids = (await db.scalars(
+                select(PRReminder.id).where(
+                    PRReminder.is_sent == False,
+                    PRReminder.reminder_time <= utcnow(),
+                ).order_by(PRReminder.reminder_time).limit(self.batch_size)
+            )).all()
+            if not due_ids:
+                return []
+            # Only rows still unsent are updated, so a reminder claimed by another instance is skipped
+            claimed = (await db.execute(
+                update(PRReminder)
+                .where(PRReminder.id.in_(due_ids), PRReminder.is_sent == False)
+                .values(is_sent=True)
+                .returning(PRReminder.owner, PRReminder.repo, PRReminder.pr_number, PRReminder.channel, PRReminder.thread_ts)
+            )).all()
+            await db.commit()
+            return [tuple(row) for row in claimed]
+
+    async def _release(self, claimed: List[tuple], reminder_time: datetime):
+        async with AsyncSessionLocal() as db:
+            for owner, repo, pr_number, channel, thread_ts in claimed:
+                await db.execute(
+                    update(PRReminder)
+                    .where(
+                        PRReminder.owner == owner,
+                        PRReminder.repo == repo,
+                        PRReminder.pr_number == pr_number,
+                        PRReminder.channel == channel,
+                        PRReminder.thread_ts == thread_ts,
+                    )
+                    .values(is_sent=False, reminder_time=reminder_time)
+                )
+            await db.commit()
+
+    def _send_nudge(self, reminder: tuple, pr: Optional[PRMetadata]):
+        owner, repo, pr_number, channel, thread_ts = reminder
+        if pr and pr.review_status == "open":
+            post_thread_reply(
+                channel,
+                thread_ts,
+                text=f"⏰ Quick nudge! This PR is still open. Any blockers, @{pr.author}?"
+            )
+
+reminder_scheduler = ReminderScheduler(
+    batch_size=int(os.getenv("REMINDER_BATCH_SIZE", 100)),
+    concurrency=int(os.getenv("REMINDER_CONCURRENCY", 8)),
+    retention=timedelta(days=int(os.getenv("REMINDER_RETENTION_DAYS", 30))),
+)
@@ -1,51 +1,214 @@
+import datetime
+import re
 from src.app.models import PRMetadata, Signal, PRAnalysisOutput
-from typing import List
+from typing import Any, Callable, List, Iterable, Tuple, Optional, Set
+
+# Changed-file patterns, matched anywhere in the lowercased path
+TEST_PATTERN = r"test"
+# Common doc paths
+DOC_PATTERN = r"doc|readme\.md"
+
+_TEST_RE = re.compile(TEST_PATTERN)
+_DOC_RE = re.compile(DOC_PATTERN)
+
+def is_test_file(filename: str) -> bool:
+    return _TEST_RE.search(filename.lower()) is not None
+
+def is_doc_file(filename: str) -> bool:
+    return _DOC_RE.search(filename.lower()) is not None
+
+# Positions in the per-PR feature tuple that rule predicates read
+LINES_ADDED, LINES_CHANGED, AGE_DAYS, LABELS = range(4)
+
+def pr_features(pr: PRMetadata, now: datetime.datetime) -> tuple:
+    """(lines_added, lines_changed, age_days, lowercased labels) of a PR."""
+    return (
+        pr.lines_added,
+        pr.lines_added + pr.lines_removed,
+        (now - pr.created_at).days,
+        {l.lower() for l in pr.labels},
+    )
+
+class SignalRule:
+    """
+    A declarative signal. It fires when every `absent_paths` pattern matches
+    none of the changed files and the size/age/label predicates hold (all of
+    them, or any of them with `match="any"`). Thresholds are strict (>).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        message: str,
+        action: str,
+        absent_paths: Optional[str] = None,
+        min_lines_changed: Optional[int] = None,
+        min_lines_added: Optional[int] = None,
+        min_age_days: Optional[int] = None,
+        labels: Iterable[str] = (),
+        match: str = "all",
+    ):
+        self.name = name
+        self.message = message
+        self.action = action
+        self.absent_paths = absent_paths
+        self.min_lines_changed = min_lines_changed
+        self.min_lines_added = min_lines_added
+        self.min_age_days = min_age_days
+        self.labels = {l.lower() for l in labels}
+        self.match = match
+
+    def to_signal(self) -> Signal:
+        return Signal(name=self.name, detected=True, message=self.message, action=self.action)
+
+    def predicates(self) -> List[Tuple[int, Callable[[Any], bool]]]:
+        """The size/age/label checks, as (feature position, check of that feature's value) pairs."""
+        checks = []
+        if self.min_lines_changed is not None:
+            checks.append((LINES_CHANGED, lambda v, t=self.min_lines_changed: v > t))
+        if self.min_lines_added is not None:
+            checks.append((LINES_ADDED, lambda v, t=self.min_lines_added: v > t))
+        if self.min_age_days is not None:
+            checks.append((AGE_DAYS, lambda v, t=self.min_age_days: v > t))
+        if self.labels:
+            checks.append((LABELS, lambda v, wanted=self.labels: not wanted.isdisjoint(v)))
+        return checks
+
+    def condition(self) -> Callable[[tuple], bool]:
+        """The predicates folded into one check of a feature tuple (no generator for the common single-predicate rule)."""
+        checks = self.predicates()
+        if not checks:
+            return lambda f: True
+        if len(checks) == 1:
+            (i, check), = checks
+            return lambda f: check(f[i])
+        combine = any if self.match == "any" else all
+        return lambda f: combine(check(f[i]) for i, check in checks)
+
+    def column_condition(self, columns: List[list]) -> List[bool]:
+        """The same check applied to a whole batch at once, given one column per feature."""
+        checks = [[check(v) for v in columns[i]] for i, check in self.predicates()]
+        if not checks:
+            return [True] * len(columns[0])
+        combine = any if self.match == "any" else all
+        return [combine(row) for row in zip(*checks)]
+
+DEFAULT_RULES = [
+    SignalRule(
+        "Large PR",
+        message="Heads up! This PR is a bit chunky 🍔",
+        action="Consider splitting it into smaller PRs.",
+        min_lines_changed=500,
+    ),
+    SignalRule(
+        "No Tests",
+        message="No tests detected! 🧪",
+        action="Let's add one for safety.",
+        absent_paths=TEST_PATTERN,
+        # Only suggest tests if there's significant new code
+        min_lines_added=20,
+    ),
+    SignalRule(
+        "Docs Missing",
+        message="Docs missing? 📚",
+        action="Consider updating documentation for these changes.",
+        absent_paths=DOC_PATTERN,
+        min_lines_added=100,
+        labels=["feature"],
+        match="any",
+    ),
+    SignalRule(
+        "Stuck PR",
+        message="This PR has been open for more than 2 days. ⏳",
+        action="Suggest nudging reviewers.",
+        min_age_days=2,
+    ),
+]
+
+class SignalEngine:
+    """
+    Evaluates a fixed rule set. All path patterns are compiled into one
+    alternation, so a PR's filenames are scanned in a single pass over their
+    lowercased, newline-joined text that stops once every pattern has been
+    seen. Path patterns are written in lowercase and are assumed not to
+    overlap each other's matches.
+    """
+
+    def __init__(self, rules: List[SignalRule]):
+        self.rules = rules
+        self._path_groups = {}
+        for rule in rules:
+            if rule.absent_paths and rule.absent_paths not in self._path_groups:
+                self._path_groups[rule.absent_paths] = f"p{len(self._path_groups)}"
+        # Per rule: (rule, condition, path group or None), for single-PR evaluation
+        self._compiled = [(rule, rule.condition(), self._path_groups.get(rule.absent_paths)) for rule in rules]
+        # No capture groups in the combined pattern: they would stop the regex engine's literal-prefix
+        # optimizations. Each (rare) match is attributed to its pattern afterwards instead.
+        self._path_re = None
+        self._group_res = [(group, re.compile(pattern)) for pattern, group in self._path_groups.items()]
+        if self._path_groups:
+            self._path_re = re.compile("|".join(f"(?:{pattern})" for pattern in self._path_groups))
+
+    def scan_paths(self, filenames: Iterable[str]) -> Set[str]:
+        """Names of the path groups that match at least one filename."""
+        seen = set()
+        if self._path_re is None:
+            return seen
+        for m in self._path_re.finditer("\n".join(filenames).lower()):
+            text = m.group()
+            for group, regex in self._group_res:
+                if group not in seen and regex.fullmatch(text):
+                    seen.add(group)
+            if len(seen) == len(self._group_res):
+                break
+        return seen
+
+    def evaluate(self, pr: PRMetadata, now: Optional[datetime.datetime] = None) -> List[Signal]:
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        features = pr_features(pr, now)
+        seen = self.scan_paths(pr.changed_filenames)
+
+        signals = []
+        for rule, condition, group in self._compiled:
+            if group is not None and group in seen:
+                continue
+            if condition(features):
+                signals.append(rule.to_signal())
+        return signals
+
+    def evaluate_batch(self, prs: List[PRMetadata], now: Optional[datetime.datetime] = None) -> List[List[Signal]]:
+        """
+        Evaluate many PRs at once (e.g. every open PR in the org). Numeric
+        thresholds are applied column-wise over the whole batch.
+        """
+        if not prs:
+            return []
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        # One column per feature, in pr_features order
+        columns = [list(column) for column in zip(*(pr_features(pr, now) for pr in prs))]
+        paths_seen = [self.scan_paths(pr.changed_filenames) for pr in prs]
+
+        fired = []
+        for rule in self.rules:
+            result = rule.column_condition(columns)
+            if rule.absent_paths:
+                group = self._path_groups[rule.absent_paths]
+                result = [r and group not in seen for r, seen in zip(result, paths_seen)]
+            fired.append(result)
+
+        # Transpose back to per-PR signal lists, keeping rule order
+        return [
+            [rule.to_signal() for rule, column in zip(self.rules, fired) if column[i]]
+            for i in range(len(prs))
+        ]
+
+default_engine = SignalEngine(DEFAULT_RULES)
 
 def detect_signals(pr: PRMetadata) -> List[Signal]:
-    signals = []
-
-    # Large PR
-    if (pr.lines_added + pr.lines_removed) > 500:
-        signals.append(Signal(
-            name="Large PR",
-            detected=True,
-            message="Heads up! This PR is a bit chunky 🍔",
-            action="Consider splitting it into smaller PRs."
-        ))
-
-    # No Tests
-    has_test_files = any("test" in f.lower() for f in pr.changed_filenames)
-    if not has_test_files and pr.lines_added > 20: # Only suggest tests if there's significant new code
-        signals.append(Signal(
-            name="No Tests",
-            detected=True,
-            message="No tests detected! 🧪",
-            action="Let's add one for safety."
-        ))
-
-    # Docs Missing
-    # Common doc paths
-    doc_keywords = ["doc", "docs", "documentation", "readme.md"]
-    has_doc_changes = any(any(k in f.lower() for k in doc_keywords) for f in pr.changed_filenames)
-    if not has_doc_changes and (pr.lines_added > 100 or "feature" in [l.lower() for l in pr.labels]):
-        signals.append(Signal(
-            name="Docs Missing",
-            detected=True,
-            message="Docs missing? 📚",
-            action="Consider updating documentation for these changes."
-        ))
-    
-    # Stuck PR
-    import datetime
-    if (datetime.datetime.now(datetime.timezone.utc) - pr.created_at).days > 2:
-        signals.append(Signal(
-            name="Stuck PR",
-            detected=True,
-            message="This PR has been open for more than 2 days. ⏳",
-            action="Suggest nudging reviewers."
-        ))
-
-    return signals
+    return default_engine.evaluate(pr)
+
+def detect_signals_batch(prs: List[PRMetadata]) -> List[List[Signal]]:
+    return default_engine.evaluate_batch(prs)
 
 def generate_summary(pr: PRMetadata) -> str:
     # MVP: Simple rule-based summary
@@ -54,16 +217,15 @@ def generate_summary(pr: PRMetadata) -> str:
 def analyze_pr(pr: PRMetadata, suggested_reviewers: List[str] = None) -> PRAnalysisOutput:
     signals = detect_signals(pr)
     summary = generate_summary(pr)
-    
+
     # Use real reviewers if provided, otherwise fallback to placeholders
     reviewers = suggested_reviewers if suggested_reviewers else ["Alice", "Bob"]
-    
+
     hints = [s.action for s in signals]
-    
+
     return PRAnalysisOutput(
         summary=summary,
         signals=signals,
         suggested_reviewers=reviewers,
         improvement_hints=hints
     )
-
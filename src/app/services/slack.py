@@ -1,6 +1,18 @@
+import asyncio
+import contextvars
+import random
+import time
 import httpx
 import os
+from typing import Dict, List, Optional
 from src.app.models import PRAnalysisOutput
+from src.app.metrics import Counter, current_span, stage
+
+SLACK_RETRIES = Counter(
+    "prwhisperer_slack_retries_total",
+    "Slack post attempts that were retried, by reason.",
+    ("reason",),
+)
 
 def build_analysis_blocks(analysis: PRAnalysisOutput):
     # Create a nice looking message
@@ -37,28 +49,194 @@ def build_analysis_blocks(analysis: PRAnalysisOutput):
         })
     return blocks
 
-def send_slack_message(analysis: PRAnalysisOutput):
+class TokenBucket:
+    """Allows `rate` sends per second on average, with bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class SlackDispatcher:
+    """
+    Async outbound queue for Slack posts.
+
+    Each channel gets its own FIFO and token bucket (chat.postMessage allows
+    about one message per second per channel), drained by a worker task that
+    exits when the channel goes idle. 429s honor Retry-After, and network
+    errors and 5xx are retried with bounded exponential backoff.
+    """
+
+    def __init__(
+        self,
+        rate_per_channel: float = 1.0,
+        burst: int = 3,
+        max_retries: int = 5,
+        max_backoff: float = 30.0,
+        max_pending: int = 1000,
+        idle_timeout: float = 30.0,
+    ):
+        self.rate_per_channel = rate_per_channel
+        self.burst = burst
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self.max_pending = max_pending
+        self.idle_timeout = idle_timeout
+        self._client: Optional[httpx.AsyncClient] = None
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+
+    def get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=float(os.getenv("SLACK_TIMEOUT", 10)),
+                limits=httpx.Limits(max_connections=int(os.getenv("SLACK_MAX_CONNECTIONS", 10))),
+            )
+        return self._client
+
+    def submit(self, channel_key: str, url: str, payload: dict, headers: dict = None) -> asyncio.Future:
+        """
+        Queue a post without waiting for it. The returned future resolves to the
+        parsed Slack response, or None if the message was given up on.
+        """
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(channel_key)
+        if queue is None:
+            queue = self._queues[channel_key] = asyncio.Queue(maxsize=self.max_pending)
+            # Started in an empty context, so a later message's spans don't attach to whoever started the worker
+            self._workers[channel_key] = asyncio.create_task(self._channel_worker(channel_key, queue), context=contextvars.Context())
+        try:
+            # The worker outlives this request, so carry the caller's span along for tracing
+            queue.put_nowait((url, payload, headers or {}, future, current_span()))
+        except asyncio.QueueFull:
+            print(f"Slack queue for {channel_key} is full, dropping message")
+            future.set_result(None)
+        return future
+
+    def pending(self) -> int:
+        """Messages queued across all channels."""
+        return sum(q.qsize() for q in self._queues.values())
+
+    async def _channel_worker(self, channel_key: str, queue: asyncio.Queue):
+        bucket = TokenBucket(self.rate_per_channel, self.burst)
+        while True:
+            try:
+                url, payload, headers, future, parent = await asyncio.wait_for(queue.get(), timeout=self.idle_timeout)
+            except asyncio.TimeoutError:
+                if queue.empty():
+                    # Nothing can be queued between this check and the removal (no await in between)
+                    self._queues.pop(channel_key, None)
+                    self._workers.pop(channel_key, None)
+                    return
+                continue
+
+            try:
+                with stage("slack.post", parent=parent, channel=channel_key) as span:
+                    await bucket.acquire()
+                    result = await self._deliver(url, payload, headers)
+                    if result is None:
+                        span.outcome = "gave_up"
+                    elif not result.get("ok", True):
+                        span.outcome = "api_error"
+                if not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                print(f"Failed to post Slack message: {e}")
+                if not future.done():
+                    future.set_result(None)
+            finally:
+                queue.task_done()
+
+    async def _deliver(self, url: str, payload: dict, headers: dict) -> Optional[dict]:
+        client = self.get_client()
+        for attempt in range(self.max_retries + 1):
+            delay = None
+            try:
+                response = await client.post(url, headers=headers, json=payload)
+                if response.status_code == 429:
+                    delay = float(response.headers.get("Retry-After", 1))
+                    print(f"Slack rate limited us, retrying in {delay}s")
+                    SLACK_RETRIES.inc(reason="429")
+                elif response.status_code >= 500:
+                    delay = self._backoff(attempt)
+                    SLACK_RETRIES.inc(reason="5xx")
+                else:
+                    response.raise_for_status()
+                    # The Web API answers 200 with {"ok": false} for most errors; webhooks answer plain text
+                    if "application/json" not in response.headers.get("content-type", ""):
+                        return {"ok": True}
+                    data = response.json()
+                    if not data.get("ok", True):
+                        print(f"Slack API error: {data.get('error')}")
+                    return data
+            except httpx.TransportError as e:
+                print(f"Slack request failed: {e}")
+                delay = self._backoff(attempt)
+                SLACK_RETRIES.inc(reason="transport")
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(min(delay, self.max_backoff))
+
+        print(f"Giving up on Slack message after {self.max_retries + 1} attempts")
+        return None
+
+    def _backoff(self, attempt: int) -> float:
+        return min(self.max_backoff, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+    async def close(self, timeout: float = 5.0):
+        """Give queued messages a moment to go out, then stop the workers and the client."""
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(q.join() for q in list(self._queues.values()))),
+                timeout=timeout,
+            )
+        except asyncio.TimeoutError:
+            print("Slack queue not drained before shutdown")
+        for task in list(self._workers.values()):
+            task.cancel()
+        self._queues.clear()
+        self._workers.clear()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+dispatcher = SlackDispatcher(
+    rate_per_channel=float(os.getenv("SLACK_RATE_PER_CHANNEL", 1.0)),
+    burst=int(os.getenv("SLACK_BURST", 3)),
+    max_retries=int(os.getenv("SLACK_MAX_RETRIES", 5)),
+)
+
+def slack_api_url(method: str) -> str:
+    return f"{os.getenv('SLACK_API_URL', 'https://slack.com/api')}/{method}"
+
+def send_slack_message(analysis: PRAnalysisOutput) -> Optional[asyncio.Future]:
     webhook_url = os.getenv("SLACK_WEBHOOK_URL")
     if not webhook_url:
         print("Slack webhook URL not set.")
-        return
+        return None
 
     payload = {"blocks": build_analysis_blocks(analysis)}
-    
-    try:
-        response = httpx.post(webhook_url, json=payload)
-        response.raise_for_status()
-    except Exception as e:
-        print(f"Failed to send Slack message: {e}")
-
-def post_thread_reply(channel: str, thread_ts: str, analysis: PRAnalysisOutput = None, text: str = None):
+    return dispatcher.submit("webhook", webhook_url, payload)
+
+def post_thread_reply(channel: str, thread_ts: str, analysis: PRAnalysisOutput = None, text: str = None) -> Optional[asyncio.Future]:
+    """Queue a threaded reply; returns immediately with a future for the Slack response."""
     # Note: Threaded replies usually require a Slack Bot Token (chat.postMessage)
     # rather than an Incoming Webhook. We'll check for the token first.
     token = os.getenv("SLACK_BOT_TOKEN")
     webhook_url = os.getenv("SLACK_WEBHOOK_URL")
 
     if token:
-        url = "https://slack.com/api/chat.postMessage"
         headers = {"Authorization": f"Bearer {token}"}
         payload = {
             "channel": channel,
@@ -68,12 +246,8 @@ def post_thread_reply(channel: str, thread_ts: str, analysis: PRAnalysisOutput =
             payload["blocks"] = build_analysis_blocks(analysis)
         else:
             payload["text"] = text
-            
-        try:
-            response = httpx.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-        except Exception as e:
-            print(f"Failed to post Slack thread reply via API: {e}")
+
+        return dispatcher.submit(channel, slack_api_url("chat.postMessage"), payload, headers)
     elif webhook_url:
         # Fallback to webhook (might not support threading depending on webhook type)
         payload = {"thread_ts": thread_ts}
@@ -81,8 +255,119 @@ def post_thread_reply(channel: str, thread_ts: str, analysis: PRAnalysisOutput =
             payload["blocks"] = build_analysis_blocks(analysis)
         else:
             payload["text"] = text
-        try:
-            httpx.post(webhook_url, json=payload)
-        except Exception as e:
-            print(f"Failed to post Slack thread reply via Webhook: {e}")
+        return dispatcher.submit("webhook", webhook_url, payload)
+    return None
+
+def update_message(channel: str, ts: str, text: str) -> Optional[asyncio.Future]:
+    """Queue a chat.update of a message we posted; needs the bot token (webhook posts can't be edited)."""
+    token = os.getenv("SLACK_BOT_TOKEN")
+    if not token:
+        return None
+    headers = {"Authorization": f"Bearer {token}"}
+    # Same queue as the channel's posts, so an edit never overtakes the post it edits
+    return dispatcher.submit(channel, slack_api_url("chat.update"), {"channel": channel, "ts": ts, "text": text}, headers)
+
+# Longest text put in one message; Slack truncates past 40k characters and advises staying under 4k
+SLACK_MAX_MESSAGE_CHARS = int(os.getenv("SLACK_MAX_MESSAGE_CHARS", 4000))
+# Least time between two edits of a progressive reply
+SLACK_UPDATE_INTERVAL = float(os.getenv("SLACK_UPDATE_INTERVAL", 1.0))
+
+def split_message(text: str, limit: int = SLACK_MAX_MESSAGE_CHARS) -> List[str]:
+    """Split `text` into chunks of at most `limit` characters, at line breaks where possible."""
+    chunks, current = [], ""
+    for line in text.split("\n"):
+        while len(line) > limit:
+            # A single line that doesn't fit anywhere is cut hard
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:limit])
+            line = line[limit:]
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > limit:
+            chunks.append(current)
+            current = line
+        else:
+            current = candidate
+    chunks.append(current)
+    return chunks
+
+class ProgressiveReply:
+    """
+    A thread reply that is edited in place as results come in.
+
+    `update()` only records the latest text; a background flush posts it,
+    then applies at most one round of chat.update per `interval`, so a burst
+    of results turns into one edit. Text longer than `max_chars` continues in
+    further replies, each edited only when its part changed. Without a bot
+    token messages can't be edited, so only the text given to `finish()` is
+    posted.
+    """
+
+    def __init__(self, channel: str, thread_ts: str, interval: float = SLACK_UPDATE_INTERVAL,
+                 max_chars: int = SLACK_MAX_MESSAGE_CHARS):
+        self.channel = channel
+        self.thread_ts = thread_ts
+        self.interval = interval
+        self.max_chars = max_chars
+        self.editable = bool(os.getenv("SLACK_BOT_TOKEN"))
+        # Per posted message: its ts (None if the post failed) and the text it currently shows
+        self.sent: List[list] = []
+        self._pending: Optional[str] = None
+        self._last_flush = float("-inf")
+        self._flusher: Optional[asyncio.Task] = None
+
+    def update(self, text: str):
+        if not self.editable:
+            return
+        self._pending = text
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush())
+
+    async def finish(self, text: str):
+        """Show the final text and wait until it has been sent."""
+        self._pending = text
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush())
+        await self._flusher
+
+    async def _flush(self):
+        while self._pending is not None:
+            wait = self._last_flush + self.interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            text, self._pending = self._pending, None
+            self._last_flush = time.monotonic()
+            try:
+                await self._send(split_message(text, self.max_chars))
+            except Exception as e:
+                print(f"Failed to update Slack reply: {e}")
+
+    async def _send(self, chunks: List[str]):
+        for i, chunk in enumerate(chunks):
+            if i < len(self.sent):
+                ts, shown = self.sent[i]
+                if chunk == shown:
+                    continue
+                if ts is not None:
+                    result = await _resolve(update_message(self.channel, ts, chunk))
+                    if result and result.get("ok"):
+                        self.sent[i][1] = chunk
+                    continue
+            # A new continuation message, or a post that failed last time
+            result = await _resolve(post_thread_reply(self.channel, self.thread_ts, text=chunk))
+            entry = [result.get("ts") if result and result.get("ok") else None, chunk]
+            if i < len(self.sent):
+                self.sent[i] = entry
+            else:
+                self.sent.append(entry)
+        # Parts left over from a longer earlier text
+        for i in range(len(chunks), len(self.sent)):
+            ts, shown = self.sent[i]
+            if ts is not None and shown != "…":
+                await _resolve(update_message(self.channel, ts, "…"))
+                self.sent[i][1] = "…"
 
+async def _resolve(future: Optional[asyncio.Future]) -> Optional[dict]:
+    # None when Slack isn't configured at all
+    return await future if future is not None else None
@@ -0,0 +1,35 @@
+"""
+Job workers without the web server, so queued Slack events can be spread
+over as many processes (or machines sharing DATABASE_URL) as needed:
+
+    python -m src.app.worker
+
+Set JOB_WORKERS_IN_PROCESS=false on the web app when running these, so its
+event loop only acks requests.
+"""
+import asyncio
+import signal
+
+# Importing the app loads the environment and registers the job handlers
+from src.app.main import DB_INIT_ON_STARTUP, job_workers, slack_dispatcher, start_github_client, close_github_client
+from src.app.database import async_engine, init_db
+
+async def main():
+    # On SIGTERM, stop like on Ctrl-C: running jobs are handed back to the queue
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    if DB_INIT_ON_STARTUP:
+        await asyncio.to_thread(init_db)
+    await start_github_client()
+    print(f"Job worker {job_workers.worker_id} running up to {job_workers.concurrency} jobs at a time")
+    try:
+        await job_workers.run()
+    finally:
+        await slack_dispatcher.close()
+        await close_github_client()
+        await async_engine.dispose()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass